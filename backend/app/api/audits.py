@@ -4,6 +4,7 @@ Audit Run API endpoints.
 import logging
 import traceback
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
@@ -17,7 +18,11 @@ from app.schemas.audit_run import (
 )
 from app.services.audit_engine import run_audit, rerate_audit
 from app.services.report_context import build_report_context
-from app.services.llm_reports import answer_audit_question
+from app.services.llm_reports import (
+    answer_audit_question,
+    answer_audit_question_stream,
+    sse_events,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -421,3 +426,26 @@ async def ask_ai_about_audit(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"AI analysis failed: {str(e)}"
         )
+
+
+@router.post("/{audit_run_id}/ask/stream", status_code=status.HTTP_200_OK)
+async def ask_ai_about_audit_stream(
+    audit_run_id: UUID,
+    payload: AuditQuestionRequest,
+    db: Session = Depends(get_db)
+):
+    """Stream the AI answer about a specific audit run as server-sent events."""
+    question = (payload.question or "").strip()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Question cannot be empty"
+        )
+    try:
+        chunks = answer_audit_question_stream(db, audit_run_id, question)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    return StreamingResponse(sse_events(chunks), media_type="text/event-stream")
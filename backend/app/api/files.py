@@ -4,26 +4,41 @@ File upload and processing API endpoints.
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter
+from threading import Lock
+import multiprocessing
 import os
 import shutil
 from pathlib import Path
-import pandas as pd
 import time
 import logging
+from app.db.bulk_copy import copy_rows, copy_supported
 from app.db.database import get_db, settings
 from app.models import AuditRun, SourceFile, Shipment, AuditResult
 from app.schemas.source_file import SourceFileResponse, FileMappingRequest, ColumnMapping
 from app.services.file_parser import (
     infer_file_type, read_file, infer_column_mapping_detailed, infer_source_type
 )
-from app.services.normalizer import normalize_row
+from app.services.normalizer import normalize_dataframe
 from app.config.mapping_loader import get_shipment_mapping_for_file
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+SHIPMENT_INSERT_BATCH_SIZE = 1000
+# File parsing is CPU-bound, so batch normalization fans out to processes
+NORMALIZE_MAX_WORKERS = 8
+# Workers are spawned, not forked: forking the multi-threaded server process
+# can leave a child holding another thread's lock
+_NORMALIZE_MP_CONTEXT = multiprocessing.get_context("spawn")
+# One worker pool shared by all batch requests, created on first use
+_normalize_executor: Optional[ProcessPoolExecutor] = None
+_normalize_executor_lock = Lock()
+
 
 @router.post("/{audit_run_id}/upload", response_model=List[SourceFileResponse], status_code=status.HTTP_201_CREATED)
 async def upload_files(
@@ -149,6 +164,154 @@ async def get_file_mappings(
         )
 
 
+def _delete_file_shipments(db: Session, file_id: UUID) -> None:
+    """Delete normalized rows from a file (for reprocessing)."""
+    # Remove dependent audit results first to avoid FK conflicts.
+    existing_shipment_ids = [
+        row[0]
+        for row in db.query(Shipment.id).filter(Shipment.source_file_id == file_id).all()
+    ]
+    if existing_shipment_ids:
+        db.query(AuditResult).filter(
+            AuditResult.shipment_id.in_(existing_shipment_ids)
+        ).delete(synchronize_session=False)
+        db.query(Shipment).filter(Shipment.id.in_(existing_shipment_ids)).delete(
+            synchronize_session=False
+        )
+
+
+def _insert_shipments(db: Session, normalized_rows: List[Dict[str, Any]]) -> None:
+    if not normalized_rows:
+        return
+    if copy_supported(db):
+        copy_rows(db, Shipment, normalized_rows)
+        return
+    for start in range(0, len(normalized_rows), SHIPMENT_INSERT_BATCH_SIZE):
+        db.bulk_insert_mappings(
+            Shipment, normalized_rows[start : start + SHIPMENT_INSERT_BATCH_SIZE]
+        )
+
+
+def _warm_imports() -> None:
+    """Pre-import the parsing stack in each worker process."""
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+
+
+def _get_normalize_executor() -> ProcessPoolExecutor:
+    """Return the shared normalize pool, spawning it on first use."""
+    global _normalize_executor
+    with _normalize_executor_lock:
+        if _normalize_executor is None:
+            _normalize_executor = ProcessPoolExecutor(
+                max_workers=max(1, min(NORMALIZE_MAX_WORKERS, os.cpu_count() or 1)),
+                mp_context=_NORMALIZE_MP_CONTEXT,
+                initializer=_warm_imports,
+            )
+        return _normalize_executor
+
+
+def _discard_normalize_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next batch spawns a fresh one."""
+    global _normalize_executor
+    with _normalize_executor_lock:
+        if _normalize_executor is executor:
+            _normalize_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_normalize_executor() -> None:
+    """Stop the shared normalize pool's worker processes (app shutdown)."""
+    global _normalize_executor
+    with _normalize_executor_lock:
+        executor, _normalize_executor = _normalize_executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+
+
+def _parse_and_normalize(
+    storage_path: str,
+    file_type: str,
+    original_filename: str,
+    inferred_source_type: Optional[str],
+    source_file_id: UUID,
+    audit_run_id: UUID,
+    user_mappings: Dict[str, str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Read a file and normalize it into shipment rows without touching the DB.
+    Arguments are plain values so this can run in a worker process.
+    """
+    timings = {}
+    # Read file
+    read_start = time.perf_counter()
+    df = read_file(storage_path, file_type)
+    timings["read_file"] = round(time.perf_counter() - read_start, 3)
+    sheet_name_hint = None
+    if "__sheet_name" in df.columns and not df["__sheet_name"].isna().all():
+        sheet_name_hint = str(df["__sheet_name"].iloc[0])
+    
+    # Load mapping defaults from config (if available) and merge with user mappings
+    base_config = get_shipment_mapping_for_file(original_filename, sheet_name_hint)
+    mappings = {}
+    if base_config and base_config.get("columns"):
+        mappings.update(base_config["columns"])
+    # User-provided mappings override defaults
+    mappings.update(user_mappings)
+    
+    # Infer origin_dc from mapping config or source type
+    origin_dc_default = base_config.get("origin_dc") if base_config else None
+    if inferred_source_type:
+        if "Calgary" in inferred_source_type or "CGY" in inferred_source_type:
+            origin_dc_default = "CGY"
+        elif "Scarborough" in inferred_source_type or "SCARB" in inferred_source_type:
+            origin_dc_default = "SCARB"
+        elif "Toronto" in inferred_source_type or "TOR" in inferred_source_type:
+            origin_dc_default = "TOR"
+        elif "Montreal" in inferred_source_type or "MTL" in inferred_source_type:
+            origin_dc_default = "MTL"
+    
+    # Normalize all rows at once
+    normalize_start = time.perf_counter()
+    normalized_rows = normalize_dataframe(df, mappings, source_file_id, audit_run_id)
+
+    # Resolve the configured origin_dc once per sheet rather than once per row
+    if "__sheet_name" in df.columns:
+        sheet_column = df["__sheet_name"]
+        row_sheets = sheet_column.astype(object).where(sheet_column.notna(), None).tolist()
+    else:
+        row_sheets = [None] * len(normalized_rows)
+    origin_dc_by_sheet = {}
+    for normalized, row_sheet in zip(normalized_rows, row_sheets):
+        if row_sheet not in origin_dc_by_sheet:
+            row_config = get_shipment_mapping_for_file(
+                original_filename,
+                str(row_sheet) if row_sheet is not None else None,
+            )
+            row_origin_dc = origin_dc_default
+            if row_config and row_config.get("origin_dc"):
+                row_origin_dc = row_config["origin_dc"]
+            origin_dc_by_sheet[row_sheet] = row_origin_dc
+        # Set origin_dc if inferred
+        if origin_dc_by_sheet[row_sheet]:
+            normalized["origin_dc"] = origin_dc_by_sheet[row_sheet]
+
+    timings["normalize_rows"] = round(time.perf_counter() - normalize_start, 3)
+    return normalized_rows, timings
+
+
+def _normalize_args(source_file: SourceFile, mapping_request: FileMappingRequest) -> tuple:
+    return (
+        source_file.storage_path,
+        source_file.file_type,
+        source_file.original_filename,
+        source_file.inferred_source_type,
+        source_file.id,
+        source_file.audit_run_id,
+        {m.source_column: m.target_field for m in mapping_request.mappings},
+    )
+
+
 @router.post("/{file_id}/normalize", status_code=status.HTTP_200_OK)
 async def normalize_file(
     file_id: UUID,
@@ -171,88 +334,16 @@ async def normalize_file(
             detail="Audit run not found"
         )
     
-    # Delete existing normalized rows from this file (for reprocessing).
-    # Remove dependent audit results first to avoid FK conflicts.
-    existing_shipment_ids = [
-        row[0]
-        for row in db.query(Shipment.id).filter(Shipment.source_file_id == file_id).all()
-    ]
-    if existing_shipment_ids:
-        db.query(AuditResult).filter(
-            AuditResult.shipment_id.in_(existing_shipment_ids)
-        ).delete(synchronize_session=False)
-        db.query(Shipment).filter(Shipment.id.in_(existing_shipment_ids)).delete(
-            synchronize_session=False
-        )
+    _delete_file_shipments(db, file_id)
     
     try:
-        timings = {}
         total_start = time.perf_counter()
-        # Read file
-        read_start = time.perf_counter()
-        df = read_file(source_file.storage_path, source_file.file_type)
-        timings["read_file"] = round(time.perf_counter() - read_start, 3)
-        sheet_name_hint = None
-        if "__sheet_name" in df.columns and not df["__sheet_name"].isna().all():
-            sheet_name_hint = str(df["__sheet_name"].iloc[0])
-        
-        # Load mapping defaults from config (if available) and merge with user mappings
-        base_config = get_shipment_mapping_for_file(source_file.original_filename, sheet_name_hint)
-        mappings = {}
-        if base_config and base_config.get("columns"):
-            mappings.update(base_config["columns"])
-        # User-provided mappings override defaults
-        user_mappings = {m.source_column: m.target_field for m in mapping_request.mappings}
-        mappings.update(user_mappings)
-        
-        # Infer origin_dc from mapping config or source type
-        origin_dc_default = base_config.get("origin_dc") if base_config else None
-        if source_file.inferred_source_type:
-            if "Calgary" in source_file.inferred_source_type or "CGY" in source_file.inferred_source_type:
-                origin_dc_default = "CGY"
-            elif "Scarborough" in source_file.inferred_source_type or "SCARB" in source_file.inferred_source_type:
-                origin_dc_default = "SCARB"
-            elif "Toronto" in source_file.inferred_source_type or "TOR" in source_file.inferred_source_type:
-                origin_dc_default = "TOR"
-            elif "Montreal" in source_file.inferred_source_type or "MTL" in source_file.inferred_source_type:
-                origin_dc_default = "MTL"
-        
-        # Normalize each row
-        shipments_created = 0
-        normalize_start = time.perf_counter()
-        batch: List[dict] = []
-        BATCH_SIZE = 1000
-        for idx, row in df.iterrows():
-            row_sheet = None
-            if "__sheet_name" in row and not pd.isna(row["__sheet_name"]):
-                row_sheet = str(row["__sheet_name"])
-            row_config = get_shipment_mapping_for_file(source_file.original_filename, row_sheet)
-            row_origin_dc = origin_dc_default
-            if row_config and row_config.get("origin_dc"):
-                row_origin_dc = row_config["origin_dc"]
-            
-            normalized = normalize_row(
-                row,
-                mappings,
-                str(source_file.id),
-                str(source_file.audit_run_id),
-                row.to_dict()
-            )
-            
-            # Set origin_dc if inferred
-            if row_origin_dc:
-                normalized["origin_dc"] = row_origin_dc
-            
-            batch.append(normalized)
-            shipments_created += 1
-            if len(batch) >= BATCH_SIZE:
-                db.bulk_insert_mappings(Shipment, batch)
-                batch.clear()
-        
-        if batch:
-            db.bulk_insert_mappings(Shipment, batch)
-        
-        timings["normalize_rows"] = round(time.perf_counter() - normalize_start, 3)
+        normalized_rows, timings = _parse_and_normalize(
+            *_normalize_args(source_file, mapping_request)
+        )
+        _insert_shipments(db, normalized_rows)
+        shipments_created = len(normalized_rows)
+
         commit_start = time.perf_counter()
         db.commit()
         timings["db_commit"] = round(time.perf_counter() - commit_start, 3)
@@ -279,6 +370,135 @@ async def normalize_file(
         )
 
 
+@router.post("/{audit_run_id}/normalize-batch", status_code=status.HTTP_200_OK)
+def normalize_files_batch(
+    audit_run_id: UUID,
+    mapping_requests: List[FileMappingRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Normalize several files of an audit run, parsing them in parallel on the shared
+    worker pool (a single file is parsed inline). A plain def, so FastAPI runs it
+    in its threadpool while waiting on workers. All files commit together; if any
+    file fails, nothing is committed and the error names every failing file.
+    """
+    audit_run = db.query(AuditRun).filter(AuditRun.id == audit_run_id).first()
+    if not audit_run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Audit run {audit_run_id} not found"
+        )
+
+    file_ids = [request.file_id for request in mapping_requests]
+    duplicates = [str(file_id) for file_id, count in Counter(file_ids).items() if count > 1]
+    if duplicates:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Files listed more than once: {', '.join(duplicates)}"
+        )
+    source_files = {
+        source_file.id: source_file
+        for source_file in db.query(SourceFile).filter(
+            SourceFile.id.in_(file_ids),
+            SourceFile.audit_run_id == audit_run_id,
+        ).all()
+    }
+    missing = [str(file_id) for file_id in file_ids if file_id not in source_files]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Files not found in audit run: {', '.join(missing)}"
+        )
+
+    for file_id in source_files:
+        _delete_file_shipments(db, file_id)
+
+    total_start = time.perf_counter()
+    file_results = []
+    file_errors: List[str] = []
+
+    def _store(
+        source_file: SourceFile,
+        normalized_rows: List[Dict[str, Any]],
+        timings: Dict[str, float],
+    ) -> None:
+        if file_errors:
+            return  # the batch is rolled back anyway
+        try:
+            _insert_shipments(db, normalized_rows)
+        except Exception as e:
+            logger.exception("Failed to store shipments from %s", source_file.original_filename)
+            file_errors.append(f"{source_file.original_filename}: {e}")
+            return
+        file_results.append({
+            "file_id": str(source_file.id),
+            "shipments_created": len(normalized_rows),
+            "timings": timings,
+        })
+
+    if len(mapping_requests) == 1:
+        source_file = source_files[mapping_requests[0].file_id]
+        try:
+            result = _parse_and_normalize(*_normalize_args(source_file, mapping_requests[0]))
+        except Exception as e:
+            logger.exception("Failed to normalize %s", source_file.original_filename)
+            file_errors.append(f"{source_file.original_filename}: {e}")
+        else:
+            _store(source_file, *result)
+    elif mapping_requests:
+        executor = _get_normalize_executor()
+        futures = {
+            executor.submit(
+                _parse_and_normalize,
+                *_normalize_args(source_files[request.file_id], request),
+            ): source_files[request.file_id]
+            for request in mapping_requests
+        }
+        for future in as_completed(futures):
+            source_file = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_normalize_executor(executor)
+                logger.exception("Failed to normalize %s", source_file.original_filename)
+                file_errors.append(f"{source_file.original_filename}: {e}")
+                continue
+            _store(source_file, *result)
+
+    if file_errors:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error normalizing files: {'; '.join(file_errors)}"
+        )
+
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error normalizing files: {str(e)}"
+        )
+    shipments_created = sum(result["shipments_created"] for result in file_results)
+    total_seconds = round(time.perf_counter() - total_start, 3)
+    logger.info(
+        "Normalized %d files (%d rows) for audit %s in %.2fs",
+        len(file_results),
+        shipments_created,
+        audit_run_id,
+        total_seconds,
+    )
+
+    return {
+        "message": f"Normalized {shipments_created} shipments from {len(file_results)} files",
+        "shipments_created": shipments_created,
+        "files": file_results,
+        "timings": {"total": total_seconds},
+    }
+
+
 @router.get("/{file_id}", response_model=SourceFileResponse)
 async def get_file(
     file_id: UUID,
@@ -9,7 +9,11 @@ from typing import Optional
 import os
 from app.db.database import get_db
 from app.models import AuditRun, LaneStat, AuditResult, Shipment
-from app.services.llm_reports import generate_executive_summary
+from app.services.llm_reports import (
+    generate_executive_summary,
+    generate_executive_summary_stream,
+    sse_events,
+)
 from app.services.export import generate_excel_report, generate_pdf_report
 
 router = APIRouter()
@@ -38,6 +42,22 @@ async def create_executive_summary(
         )
 
 
+@router.post("/{audit_run_id}/executive-summary/stream")
+async def stream_executive_summary(
+    audit_run_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Stream the executive summary as server-sent events while it is generated."""
+    try:
+        chunks = generate_executive_summary_stream(db, audit_run_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    return StreamingResponse(sse_events(chunks), media_type="text/event-stream")
+
+
 @router.get("/{audit_run_id}/excel")
 async def download_excel_report(
     audit_run_id: UUID,
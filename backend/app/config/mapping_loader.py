@@ -1,12 +1,18 @@
 """
 Utilities for loading column/tariff mapping configuration.
+
+The YAML file is read once per process. load_mapping_config and the lookups
+derived from it (get_province_region_map, get_tariff_mapping_for_file, and
+file_parser's deterministic column mappings) are cached with no invalidation
+hook, so edits to column_mappings.yaml take effect after a server restart.
 """
 from __future__ import annotations
 
 import re
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 
 import yaml
 
@@ -27,13 +33,25 @@ def load_mapping_config() -> Dict[str, Any]:
         return yaml.safe_load(fh) or {}
 
 
+@lru_cache()
+def get_province_region_map() -> Mapping[str, str]:
+    """Province code -> region from config (upper-cased keys, without the default)."""
+    region_map = load_mapping_config().get("region_map") or {}
+    return MappingProxyType({
+        str(province).upper().strip(): region
+        for province, region in region_map.items()
+        if province != "default"
+    })
+
+
+def get_default_region() -> Optional[str]:
+    return (load_mapping_config().get("region_map") or {}).get("default")
+
+
 def get_region_from_config(province: Optional[str]) -> Optional[str]:
     if not province:
         return None
-    config = load_mapping_config()
-    region_map = config.get("region_map", {})
-    province_upper = province.upper().strip()
-    return region_map.get(province_upper, region_map.get("default"))
+    return get_province_region_map().get(province.upper().strip(), get_default_region())
 
 
 def _match_file_config(section: str, filename: str) -> Optional[Dict[str, Any]]:
@@ -100,6 +118,7 @@ def get_shipment_mapping_for_file(filename: str, sheet_name: Optional[str] = Non
     return mapping
 
 
+@lru_cache(maxsize=64)
 def get_tariff_mapping_for_file(filename: str, carrier_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
     config = load_mapping_config().get("tariffs", {})
     filename_lower = filename.lower()
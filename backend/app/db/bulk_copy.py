@@ -0,0 +1,57 @@
+"""
+PostgreSQL COPY helpers for bulk inserts on a session's connection.
+"""
+import io
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+
+def copy_supported(db: Session) -> bool:
+    """COPY FROM STDIN needs psycopg2's copy_expert."""
+    bind = db.get_bind()
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+
+def _copy_field(value: Any) -> str:
+    """Render one value for COPY ... WITH CSV (an unquoted empty field is NULL)."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):  # before int, which bool subclasses
+        return "true" if value else "false"
+    if isinstance(value, (Decimal, int, float, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        value = json.dumps(value, default=str)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(db: Session, model: Any, rows: List[Dict[str, Any]]) -> None:
+    """
+    Stream rows into the model's table with COPY on the session's connection.
+    Missing `id` / `created_at` values are filled like the column defaults.
+    """
+    column_names = [column.name for column in model.__table__.columns]
+    created_at = datetime.utcnow()
+    buffer = io.StringIO()
+    for row in rows:
+        values = dict(row)
+        values.setdefault("id", uuid.uuid4())
+        values.setdefault("created_at", created_at)
+        buffer.write(",".join(_copy_field(values.get(name)) for name in column_names))
+        buffer.write("\n")
+    buffer.seek(0)
+    # Same DBAPI connection as the session, so the COPY shares its transaction
+    # with earlier statements and is committed or rolled back with them.
+    dbapi_connection = db.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(column_names)}) FROM STDIN WITH CSV",
+            buffer,
+        )
@@ -90,6 +90,9 @@ app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 app.include_router(tariffs.router, prefix="/api/tariffs", tags=["tariffs"])
 
+# Stop the shared file-normalization worker processes with the server
+app.add_event_handler("shutdown", files.shutdown_normalize_executor)
+
 
 @app.get("/")
 async def root():
@@ -3,9 +3,10 @@ Audit engine - computes metrics, lane stats, and exceptions.
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
-from typing import List, Dict, Any, Optional
+from typing import Iterator, List, Dict, Any, Optional
 from decimal import Decimal
 from uuid import UUID
+import heapq
 import time
 import logging
 from app.models import Shipment, AuditResult, LaneStat, AuditRun
@@ -15,6 +16,11 @@ from app.services.rating_pipeline import run_vectorized_rerate
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of high cost-per-lb shipments reported as outliers
+OUTLIER_LIMIT = 50
+# Shipments fetched per round-trip when scanning an audit for exceptions
+EXCEPTIONS_BATCH_SIZE = 1000
+
 def compute_cost_metrics(shipment: Shipment) -> Dict[str, Optional[Decimal]]:
     """Compute cost per lb and cost per pallet for a shipment."""
     cost_per_lb = None
@@ -300,8 +306,10 @@ def rerate_audit(db: Session, audit_run_id: UUID, tariff_ids: Optional[List[UUID
     timings["lane_stats_with_tariffs"] = round(time.perf_counter() - lane_start, 3)
     
     audit_run = db.query(AuditRun).filter(AuditRun.id == audit_run_id).first()
-    summary_metrics = audit_run.summary_metrics or {}
-    summary_timings = summary_metrics.get("timings", {})
+    # Work on copies: assigning back the same mutated dict is not seen as a change,
+    # so the metrics would not be saved and updated_at would not move.
+    summary_metrics = dict(audit_run.summary_metrics or {})
+    summary_timings = dict(summary_metrics.get("timings", {}))
     summary_timings.update({f"rerate_{k}": v for k, v in timings.items()})
     summary_timings["rerate_total"] = round(time.perf_counter() - overall_start, 3)
     
@@ -395,29 +403,29 @@ def compute_lane_stats_with_tariffs(db: Session, audit_run_id: UUID) -> None:
     db.commit()
 
 
-def get_exceptions(db: Session, audit_run_id: UUID, exception_type: str = "all") -> List[Dict[str, Any]]:
+def _normalize_exception_type(exception_type: Optional[str]) -> str:
+    return (exception_type or "all").strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def iter_exceptions(
+    db: Session, audit_run_id: UUID, exception_type: str = "all"
+) -> Iterator[Dict[str, Any]]:
     """
-    Get exception shipments (zero charges, outliers, etc.).
-    
+    Yield exception shipments one at a time, unsorted and without the outlier limit.
+
     exception_type: "zero_charge", "outliers", "zero_weight", "all"
     """
-    normalized_exception_type = (
-        (exception_type or "all").strip().lower().replace("-", "_").replace(" ", "_")
-    )
+    normalized_exception_type = _normalize_exception_type(exception_type)
 
-    shipments = db.query(Shipment).join(
+    # Load each shipment with its result in one query and stream it in batches,
+    # so large audits never hold every ORM object in memory at once.
+    rows = db.query(Shipment, AuditResult).join(
         AuditResult, Shipment.id == AuditResult.shipment_id
     ).filter(
         Shipment.audit_run_id == audit_run_id
-    ).all()
-    
-    exceptions = []
-    
-    for shipment in shipments:
-        audit_result = shipment.audit_result
-        if not audit_result:
-            continue
-        
+    ).yield_per(EXCEPTIONS_BATCH_SIZE)
+
+    for shipment, audit_result in rows:
         flags = audit_result.flags or []
         
         normalized_flags = {flag.lower() for flag in flags}
@@ -430,7 +438,7 @@ def get_exceptions(db: Session, audit_run_id: UUID, exception_type: str = "all")
             include = True
 
         if include:
-            exceptions.append({
+            yield {
                 "shipment_id": str(shipment.id),
                 "shipment_ref": shipment.shipment_ref,
                 "origin_dc": shipment.origin_dc,
@@ -445,12 +453,19 @@ def get_exceptions(db: Session, audit_run_id: UUID, exception_type: str = "all")
                 "tariff_match_notes": audit_result.tariff_match_notes,
                 "expected_charge": float(audit_result.best_charge) if audit_result.best_charge else None,
                 "best_carrier": audit_result.best_carrier,
-            })
+            }
+
+
+def get_exceptions(db: Session, audit_run_id: UUID, exception_type: str = "all") -> List[Dict[str, Any]]:
+    """
+    Get exception shipments (zero charges, outliers, etc.).
     
-    # For outliers, sort by cost_per_lb descending
-    if normalized_exception_type == "outliers":
-        exceptions.sort(key=lambda x: x["cost_per_lb"] or 0, reverse=True)
-        # Return top 50
-        exceptions = exceptions[:50]
+    exception_type: "zero_charge", "outliers", "zero_weight", "all"
+    """
+    exceptions = iter_exceptions(db, audit_run_id, exception_type)
+
+    # For outliers, keep the top 50 by cost_per_lb descending (ties in scan order)
+    if _normalize_exception_type(exception_type) == "outliers":
+        return heapq.nlargest(OUTLIER_LIMIT, exceptions, key=lambda x: x["cost_per_lb"] or 0)
     
-    return exceptions
+    return list(exceptions)
@@ -1,141 +1,157 @@
 """
 File parsing and column mapping services.
 """
+from __future__ import annotations
+
+import codecs
+import heapq
 import json
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, AbstractSet, Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
-import pandas as pd
-from openai import OpenAI
-
 from app.config.mapping_loader import (
     get_region_from_config,
     get_shipment_mapping_for_file,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from openai import OpenAI
+
 logger = logging.getLogger(__name__)
 
 
 # Known column name patterns for mapping (case-insensitive matching)
 # Extended to cover all known variants from GI shipment files
-COLUMN_PATTERNS = {
+# Values are tuples: the patterns are fixed at import and never mutated
+COLUMN_PATTERNS: Dict[str, Tuple[str, ...]] = {
     # Scale/actual weight
-    "weight": [
+    "weight": (
         "wgt", "weight", "invwgt", "actual_weight", "ship_weight",
         "actwgt", "actual weight", "scale_weight", "scalewgt",
-    ],
+    ),
     # Billed/rated weight (what carrier charges on)
-    "billed_weight": [
+    "billed_weight": (
         "prbwgt", "billwgt", "billed_weight", "chargeable_weight",
         "billed weight", "rated_weight", "ratedwgt",
-    ],
+    ),
     # Pallets / pieces
-    "pallets": [
+    "pallets": (
         "invpcs", "pcs", "pieces", "pallets", "pallet", "qty_pallets",
         "pallet_count", "skids", "skd", "handling_units",
-    ],
+    ),
     # Charge / amount
-    "charge": [
+    "charge": (
         "trfamt", "price", "amount", "charge", "cost", "freight_charge",
         "total_charge", "linehaul", "total charge", "freight",
-    ],
+    ),
     # Shipment reference / PRO
-    "shipment_ref": [
+    "shipment_ref": (
         "pronumber", "pro number", "pro_number", "pro no", "prono",
         "ref", "shipment", "pro", "tracking", "shipment_id",
         "bol", "bolnumber", "bol number",
-    ],
+    ),
     # Origin fields (shipper)
-    "origin_city": [
+    "origin_city": (
         "shpcity", "shcity", "s.city", "shipper city", "shipper_city",
         "origin", "origin_city", "from_city", "ship_from_city", "scity",
         "sh_city", "shippercity", "shipfromcity", "shipcity",
-    ],
-    "origin_province": [
+    ),
+    "origin_province": (
         "shpst", "shstate", "shprv", "shp prov", "shp_prov", "sprov",
         "origin_prov", "from_prov", "ship_from_prov", "origin_province",
         "shipper_province", "shipper province", "sh_prov", "shprov",
-    ],
-    "origin_postal": [
+    ),
+    "origin_postal": (
         "shppc", "shpcode", "shp postal", "shp_zip", "szip", "spostal",
         "origin_postal", "from_postal", "ship_from_postal", "origin_zip",
         "shpostal", "sh postal", "shipper postal", "sh_postal", "shzip",
-    ],
-    "origin_name": [
+    ),
+    "origin_name": (
         "shname", "shipper name", "shpname", "shipper_name", "sname",
         "shipper", "sender", "shipperid", "shipper_no",
-    ],
-    "origin_address": [
+    ),
+    "origin_address": (
         "shadd1", "shp add1", "shipper address", "shipper_address", "saddr",
         "shaddr", "sh_address", "shstrno", "sh_street",
-    ],
+    ),
     # Destination fields (consignee)
-    "dest_city": [
+    "dest_city": (
         "cnpcity", "cncity", "ccity", "dcity", "destcity", "ccityname",
         "dest", "destination", "dest_city", "to_city", "ship_to_city",
         "consignee_city", "consignee city", "rccity", "rc_city",
         "receiver_city", "receivercity", "rcvcity",
-    ],
-    "dest_province": [
+    ),
+    "dest_province": (
         "cnpst", "cprov", "cstate", "destprov", "c_prov", "dprov",
         "dest_prov", "to_prov", "ship_to_prov", "dest_province", "province",
         "consignee_province", "consignee province", "rcprov", "rc_prov",
         "rcstate", "rc_st", "receiver_province",
-    ],
-    "dest_postal": [
+    ),
+    "dest_postal": (
         "cnppc", "cpostal", "cpc", "czip", "destpostal", "dzip",
         "dest_postal", "to_postal", "ship_to_postal", "dest_zip", "postal",
         "rcpostal", "rc_postal", "rczip", "receiver_postal",
-    ],
-    "dest_country": [
+    ),
+    "dest_country": (
         "dest_country", "destination country", "country", "consignee_country",
         "receiver_country", "rccountry", "rc_country", "cncountry",
-    ],
-    "dest_name": [
+    ),
+    "dest_name": (
         "cnname", "consignee name", "cname", "consignee_name", "dname",
         "rcname", "receiver_name", "receivername", "receiver",
-    ],
-    "dest_address": [
+    ),
+    "dest_address": (
         "cnadd1", "cadd1", "dest address", "consignee_address", "daddr",
         "rcadd1", "rc_address", "rcaddr", "rcstrno", "receiver_address",
-    ],
+    ),
     # Dates
-    "ship_date": [
+    "ship_date": (
         "ship_date", "date", "shipment_date", "ship_dt", "shipdate",
-    ],
+    ),
     # Carrier
-    "carrier": [
+    "carrier": (
         "carrier", "carrier_name", "transport", "trucking", "scac",
-    ],
+    ),
     # Dimensional weight
-    "dim_weight": [
+    "dim_weight": (
         "dim_weight", "dimensional_weight", "dim_wgt", "cube_weight",
         "dimwgt", "dim weight",
-    ],
+    ),
     # Customer reference
-    "customer_ref": [
+    "customer_ref": (
         "customer ref", "custref", "customerref", "ref", "cust_ref",
         "customer_ref", "customer reference",
-    ],
+    ),
     # Transit days
-    "std_transit_days": [
+    "std_transit_days": (
         "standd", "std_days", "standard_days", "std transit",
-    ],
-    "actual_transit_days": [
+    ),
+    "actual_transit_days": (
         "actdys", "act_days", "actualdays", "actual_days", "actual transit",
-    ],
+    ),
     # POD
-    "pod_signed": [
+    "pod_signed": (
         "signed", "pod signed", "pod_signed", "podsigned",
-    ],
-    "pod_signature": [
+    ),
+    "pod_signature": (
         "signature", "pod name", "pod_signature", "podsignature",
-    ],
+    ),
 }
 
+# Filename markers for source type, checked in order (first match wins)
+_SOURCE_TYPE_PATTERNS = (
+    (re.compile(r"CLG|CALGARY|CGY"), "Calgary DC export"),
+    (re.compile(r"SCARB|SC-"), "Scarborough DC export"),
+    (re.compile(r"TORONTO|TOR"), "Toronto DC export"),
+    (re.compile(r"MONTREAL|MTL"), "Montreal DC export"),
+)
+
 TARGET_FIELD_DESCRIPTIONS: Dict[str, str] = {
     "shipment_ref": "Shipment reference identifier (PRO/BOL/tracking).",
     "origin_dc": "Origin distribution center code.",
@@ -167,7 +183,13 @@ TARGET_FIELD_DESCRIPTIONS: Dict[str, str] = {
 
 PATTERN_MATCH_MIN_CONFIDENCE = 0.55
 AI_MATCH_MIN_CONFIDENCE = 0.55
+FUZZY_MATCH_MIN_SCORE = 85
+FUZZY_MATCH_MAX_CONFIDENCE = 0.8
 AI_DEFAULT_MODEL = os.getenv("COLUMN_MAPPING_MODEL", "gpt-4o-mini")
+EXCEL_READ_MAX_WORKERS = 8
+CSV_SNIFF_CHUNK_BYTES = 1 << 20
+AI_RESPONSE_MAX_CHARS = 65536
+_JSON_DECODER = json.JSONDecoder()
 _OPENAI_CLIENT: Any = None
 
 
@@ -197,8 +219,20 @@ def _resolve_source_column(df_columns: List[Any], configured_name: Any) -> Optio
 
 
 def _score_pattern_match(column_name: str, pattern: str) -> float:
-    col_norm = _normalize_token(column_name)
-    pat_norm = _normalize_token(pattern)
+    return _score_normalized_match(
+        _normalize_token(column_name),
+        _token_set(column_name),
+        _normalize_token(pattern),
+        _token_set(pattern),
+    )
+
+
+def _score_normalized_match(
+    col_norm: str,
+    col_tokens: AbstractSet[str],
+    pat_norm: str,
+    pat_tokens: AbstractSet[str],
+) -> float:
     if not col_norm or not pat_norm:
         return 0.0
     if col_norm == pat_norm:
@@ -207,8 +241,6 @@ def _score_pattern_match(column_name: str, pattern: str) -> float:
         return 0.92
     if pat_norm in col_norm:
         return 0.82
-    col_tokens = _token_set(column_name)
-    pat_tokens = _token_set(pattern)
     if not col_tokens or not pat_tokens:
         return 0.0
     overlap = len(col_tokens.intersection(pat_tokens))
@@ -217,7 +249,64 @@ def _score_pattern_match(column_name: str, pattern: str) -> float:
     return min(0.8, overlap / max(len(col_tokens), len(pat_tokens)))
 
 
+# COLUMN_PATTERNS pre-normalized once at import: target -> ((pattern, normalized, tokens), ...).
+_NORMALIZED_PATTERNS: Dict[str, Tuple[Tuple[str, str, frozenset[str]], ...]] = {
+    target_field: tuple(
+        (pattern, _normalize_token(pattern), frozenset(_token_set(pattern))) for pattern in patterns
+    )
+    for target_field, patterns in COLUMN_PATTERNS.items()
+}
+
+_FLAT_PATTERNS: Tuple[Tuple[str, str], ...] = tuple(
+    (target_field, pattern)
+    for target_field, patterns in COLUMN_PATTERNS.items()
+    for pattern in patterns
+)
+_FLAT_PATTERN_TEXTS: Tuple[str, ...] = tuple(pattern for _, pattern in _FLAT_PATTERNS)
+
+# Reverse index normalized pattern -> {target: pattern} for every target listing it.
+_EXACT_PATTERN_TARGETS: Dict[str, Dict[str, str]] = {}
+for _target_field, _entries in _NORMALIZED_PATTERNS.items():
+    for _pattern, _pat_norm, _ in _entries:
+        _EXACT_PATTERN_TARGETS.setdefault(_pat_norm, {}).setdefault(_target_field, _pattern)
+
+
+def _fuzzy_pattern_scores(columns: List[str]) -> Dict[str, Dict[str, tuple[float, str]]]:
+    """
+    Score columns against every pattern with RapidFuzz in one vectorized cdist call.
+
+    Returns column -> target -> (confidence, pattern) for matches at or above
+    FUZZY_MATCH_MIN_SCORE. Returns {} when rapidfuzz is not installed.
+    """
+    if not columns:
+        return {}
+    try:
+        from rapidfuzz import fuzz, process, utils
+    except ImportError:
+        return {}
+
+    scores = process.cdist(
+        columns,
+        _FLAT_PATTERN_TEXTS,
+        scorer=fuzz.token_set_ratio,
+        processor=utils.default_process,
+        score_cutoff=FUZZY_MATCH_MIN_SCORE,
+        workers=-1,
+    )
+    results: Dict[str, Dict[str, tuple[float, str]]] = {}
+    for row_idx, pattern_idx in zip(*scores.nonzero()):
+        target_field, pattern = _FLAT_PATTERNS[pattern_idx]
+        # Fuzzy hits stay below substring matches so they never outrank them.
+        confidence = min(FUZZY_MATCH_MAX_CONFIDENCE, float(scores[row_idx, pattern_idx]) / 100)
+        by_target = results.setdefault(columns[row_idx], {})
+        if confidence > by_target.get(target_field, (0.0, ""))[0]:
+            by_target[target_field] = (confidence, pattern)
+    return results
+
+
 def _build_column_samples(df: pd.DataFrame, max_values: int = 3) -> Dict[str, List[str]]:
+    import pandas as pd
+
     samples: Dict[str, List[str]] = {}
     for col in df.columns:
         if _is_meta_column(col):
@@ -330,6 +419,9 @@ def _get_openai_client() -> Optional[OpenAI]:
             _OPENAI_CLIENT = False
         else:
             try:
+                # Deferred: the openai SDK is slow to import and only needed for AI mapping.
+                from openai import OpenAI
+
                 _OPENAI_CLIENT = OpenAI(api_key=api_key)
             except Exception as exc:
                 logger.warning("Failed to initialize OpenAI client for mapping: %s", exc)
@@ -340,20 +432,21 @@ def _get_openai_client() -> Optional[OpenAI]:
 def _extract_json_object(text: str) -> Optional[Dict[str, Any]]:
     if not text:
         return None
-    payload = text.strip()
+    payload = text[:AI_RESPONSE_MAX_CHARS].strip()
     try:
         return json.loads(payload)
     except json.JSONDecodeError:
         pass
 
+    # Decode only the first complete object; tolerates chatter before/after the JSON.
     start = payload.find("{")
-    end = payload.rfind("}")
-    if start == -1 or end == -1 or end <= start:
+    if start == -1:
         return None
     try:
-        return json.loads(payload[start : end + 1])
+        parsed, _ = _JSON_DECODER.raw_decode(payload, start)
     except json.JSONDecodeError:
         return None
+    return parsed if isinstance(parsed, dict) else None
 
 
 def _infer_mappings_with_ai(
@@ -448,6 +541,75 @@ def _infer_mappings_with_ai(
         return []
 
 
+def _excel_engine() -> Optional[str]:
+    """Prefer the calamine reader when python-calamine is installed."""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    return "calamine"
+
+
+def _sniff_encoding(file_path: str) -> str:
+    """
+    Pick a CSV encoding without trial reads: honour a BOM, otherwise validate
+    UTF-8 and then cp1252 (Windows exports) incrementally, and fall back to
+    latin-1 (which decodes any byte).
+    """
+    with open(file_path, "rb") as fh:
+        head = fh.read(4)
+        if head.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+        for encoding in ("utf-8", "cp1252"):
+            fh.seek(0)
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                for chunk in iter(lambda: fh.read(CSV_SNIFF_CHUNK_BYTES), b""):
+                    decoder.decode(chunk)
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                continue
+            return encoding
+    return "latin-1"
+
+
+def _missing_column(row_count: int, template: pd.Series) -> pd.Series:
+    """All-missing filler for a column absent from one sheet, typed like pd.concat would."""
+    import pandas as pd
+
+    if template.dtype.kind in "iu":
+        return pd.Series(float("nan"), index=pd.RangeIndex(row_count), dtype="float64")
+    if template.dtype.kind == "b":
+        return pd.Series(None, index=pd.RangeIndex(row_count), dtype=object)
+    return pd.Series(index=pd.RangeIndex(row_count), dtype=template.dtype)
+
+
+def _combine_sheets(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Stack per-sheet frames. Same-schema sheets concat without alignment;
+    otherwise columns are assembled one at a time so the union of columns
+    is never materialized as a reindexed copy of every sheet.
+    """
+    import pandas as pd
+
+    first_columns = dataframes[0].columns
+    if all(df.columns.equals(first_columns) for df in dataframes[1:]):
+        return pd.concat(dataframes, ignore_index=True, copy=False)
+
+    all_columns = list(dict.fromkeys(col for df in dataframes for col in df.columns))
+    combined: Dict[Any, pd.Series] = {}
+    for col in all_columns:
+        template = next(df[col] for df in dataframes if col in df.columns)
+        parts = [
+            df[col] if col in df.columns else _missing_column(len(df.index), template)
+            for df in dataframes
+        ]
+        combined[col] = pd.concat(parts, ignore_index=True, copy=False)
+    return pd.DataFrame(combined)
+
+
 def infer_file_type(filename: str) -> str:
     """Infer file type from extension."""
     ext = Path(filename).suffix.lower()
@@ -461,20 +623,36 @@ def infer_file_type(filename: str) -> str:
 
 def read_file(file_path: str, file_type: str) -> pd.DataFrame:
     """Read file into pandas DataFrame."""
+    import pandas as pd
+
     if file_type == "xlsx":
         # Read all non-empty sheets and combine
-        excel_file = pd.ExcelFile(file_path)
+        engine = _excel_engine()
+        with pd.ExcelFile(file_path, engine=engine) as excel_file:
+            sheet_names = list(excel_file.sheet_names)
+            if engine == "calamine" and len(sheet_names) > 1:
+                # calamine parses outside the GIL and each read opens its own handle,
+                # so sheets can be read concurrently.
+                workers = min(EXCEL_READ_MAX_WORKERS, len(sheet_names))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    frames = list(
+                        executor.map(
+                            lambda name: pd.read_excel(file_path, sheet_name=name, engine=engine),
+                            sheet_names,
+                        )
+                    )
+            else:
+                frames = [excel_file.parse(sheet_name) for sheet_name in sheet_names]
         dataframes = []
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
+        for sheet_name, df in zip(sheet_names, frames):
             if not df.empty:
                 df["__sheet_name"] = sheet_name  # keep track of origin sheet
                 dataframes.append(df)
         if dataframes:
-            return pd.concat(dataframes, ignore_index=True)
+            return _combine_sheets(dataframes)
         raise ValueError("No data found in Excel file")
     elif file_type == "csv":
-        # Try different encodings + detect shifted header rows.
+        # Detect the encoding once + detect shifted header rows.
         expected_header_tokens = {
             "shipmentref",
             "pronumber",
@@ -494,55 +672,47 @@ def read_file(file_path: str, file_type: str) -> pd.DataFrame:
             "rcprov",
             "rcpostal",
         }
-        for encoding in ["utf-8", "latin-1", "cp1252"]:
-            try:
-                preview = pd.read_csv(file_path, encoding=encoding, header=None, nrows=8)
-                best_header_idx = 0
-                best_score = -1
-                for idx in range(len(preview.index)):
-                    row_values = preview.iloc[idx].tolist()
-                    row_tokens = {
-                        _normalize_token(value)
-                        for value in row_values
-                        if pd.notna(value) and _normalize_token(value)
-                    }
-                    score = len(row_tokens.intersection(expected_header_tokens))
-                    if score > best_score:
-                        best_score = score
-                        best_header_idx = idx
-
-                if best_score >= 2 and best_header_idx > 0:
-                    return pd.read_csv(file_path, encoding=encoding, header=best_header_idx)
-                return pd.read_csv(file_path, encoding=encoding)
-            except UnicodeDecodeError:
-                continue
-        raise ValueError("Could not decode CSV file")
+        encoding = _sniff_encoding(file_path)
+        preview = pd.read_csv(file_path, encoding=encoding, header=None, nrows=8)
+        best_header_idx = 0
+        best_score = -1
+        for idx in range(len(preview.index)):
+            row_values = preview.iloc[idx].tolist()
+            row_tokens = {
+                _normalize_token(value)
+                for value in row_values
+                if pd.notna(value) and _normalize_token(value)
+            }
+            score = len(row_tokens.intersection(expected_header_tokens))
+            if score > best_score:
+                best_score = score
+                best_header_idx = idx
+
+        header_idx = best_header_idx if best_score >= 2 and best_header_idx > 0 else 0
+        return pd.read_csv(file_path, encoding=encoding, header=header_idx)
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
 
-def infer_column_mapping_detailed(
-    df: pd.DataFrame,
-    filename: Optional[str] = None,
-    sheet_name: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+@lru_cache(maxsize=256)
+def _infer_deterministic_mappings(
+    columns: tuple[str, ...],
+    filename: Optional[str],
+    sheet_name: Optional[str],
+) -> tuple[Dict[str, Dict[str, Any]], Dict[str, str], Dict[str, Dict[str, Any]]]:
     """
-    Infer column mappings with metadata for review workflows.
+    Config and pattern mapping steps, which depend only on the column names and
+    file/sheet name. Cached so repeat uploads of the same schema skip inference
+    (mapping config edits therefore need a restart, like mapping_loader);
+    callers must copy the returned dicts before mutating them.
 
-    Returns one detail row per source column:
-      - source_column
-      - target_field
-      - confidence
-      - needs_review
-      - method (config|pattern|ai|unmapped)
-      - reason
+    Returns (details_by_column, target_owner, deterministic_suggestions).
     """
     column_order: List[str] = []
     details_by_column: Dict[str, Dict[str, Any]] = {}
-    for col in df.columns:
-        if _is_meta_column(col):
+    for col_name in columns:
+        if _is_meta_column(col_name):
             continue
-        col_name = str(col)
         column_order.append(col_name)
         details_by_column[col_name] = {
             "source_column": col_name,
@@ -554,7 +724,7 @@ def infer_column_mapping_detailed(
         }
 
     if not column_order:
-        return []
+        return {}, {}, {}
 
     target_owner: Dict[str, str] = {}
     deterministic_suggestions: Dict[str, Dict[str, Any]] = {}
@@ -566,7 +736,7 @@ def infer_column_mapping_detailed(
             for configured_source, target_field in config_mapping["columns"].items():
                 if not target_field:
                     continue
-                resolved = _resolve_source_column(list(df.columns), configured_source)
+                resolved = _resolve_source_column(list(columns), configured_source)
                 if resolved is None or _is_meta_column(resolved):
                     continue
                 source_column = str(resolved)
@@ -595,72 +765,107 @@ def infer_column_mapping_detailed(
                     "reason": "Configuration mapping",
                 }
 
-    # 2) Deterministic pattern mapping for targets not already mapped by config.
+    # 2) Deterministic role-prefix and pattern mapping in one pass: collect every
+    #    candidate for unmapped columns/targets, then assign greedily by confidence.
+    candidates: List[tuple[float, str, str, str]] = []
+    fuzzy_scores = _fuzzy_pattern_scores(
+        [col for col in column_order if not details_by_column[col].get("target_field")]
+    )
     for source_column in column_order:
-        detail = details_by_column[source_column]
-        if detail.get("target_field"):
+        if details_by_column[source_column].get("target_field"):
             continue
         semantic = _infer_role_based_target(source_column)
-        if not semantic:
-            continue
-        target_field = str(semantic.get("target_field") or "")
-        if not target_field:
-            continue
-        if target_field in target_owner:
+        if semantic and semantic.get("target_field"):
+            candidates.append(
+                (
+                    float(semantic.get("confidence") or 0.0),
+                    source_column,
+                    str(semantic["target_field"]),
+                    str(semantic.get("reason") or "Semantic prefix mapping."),
+                )
+            )
+        col_norm = _normalize_token(source_column)
+        exact_hits = _EXACT_PATTERN_TARGETS.get(col_norm, {})
+        col_tokens = _token_set(source_column)
+        for target_field, entries in _NORMALIZED_PATTERNS.items():
+            if target_field in target_owner:
+                continue
+            exact_pattern = exact_hits.get(target_field)
+            if exact_pattern is not None:
+                # Exact pattern hit scores 1.0, so no other pattern for this target can beat it.
+                candidates.append(
+                    (1.0, source_column, target_field, f"Pattern match '{exact_pattern}' (1.00).")
+                )
+                continue
+            best_pattern: Optional[str] = None
+            best_score = 0.0
+            for pattern, pat_norm, pat_tokens in entries:
+                score = _score_normalized_match(col_norm, col_tokens, pat_norm, pat_tokens)
+                if score > best_score:
+                    best_score = score
+                    best_pattern = pattern
+            reason = f"Pattern match '{best_pattern}' ({best_score:.2f})."
+            fuzzy = fuzzy_scores.get(source_column, {}).get(target_field)
+            if fuzzy and fuzzy[0] > best_score:
+                best_score, best_pattern = fuzzy
+                reason = f"Fuzzy match '{best_pattern}' ({best_score:.2f})."
+            if best_pattern and best_score >= PATTERN_MATCH_MIN_CONFIDENCE:
+                candidates.append((best_score, source_column, target_field, reason))
+
+    # Stable sort keeps role-prefix candidates ahead of pattern ones on ties.
+    candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+    for confidence, source_column, target_field, reason in candidates:
+        detail = details_by_column[source_column]
+        if detail.get("target_field") or target_field in target_owner:
             continue
-        confidence = float(semantic.get("confidence") or 0.0)
         detail.update(
             {
                 "target_field": target_field,
                 "confidence": confidence,
                 "needs_review": confidence < 1.0,
                 "method": "pattern",
-                "reason": str(semantic.get("reason") or "Semantic prefix mapping."),
+                "reason": reason,
             }
         )
         target_owner[target_field] = source_column
         deterministic_suggestions[source_column] = {
             "target_field": target_field,
             "confidence": confidence,
-            "reason": str(semantic.get("reason") or "Semantic prefix mapping"),
+            "reason": reason,
         }
 
-    # 3) Deterministic pattern mapping for targets not already mapped by config.
-    for target_field, patterns in COLUMN_PATTERNS.items():
-        if target_field in target_owner:
-            continue
-        best_source: Optional[str] = None
-        best_pattern: Optional[str] = None
-        best_score = 0.0
-        for source_column in column_order:
-            detail = details_by_column[source_column]
-            if detail.get("target_field"):
-                continue
-            for pattern in patterns:
-                score = _score_pattern_match(source_column, pattern)
-                if score > best_score:
-                    best_score = score
-                    best_source = source_column
-                    best_pattern = pattern
+    return details_by_column, target_owner, deterministic_suggestions
 
-        if best_source and best_score >= PATTERN_MATCH_MIN_CONFIDENCE:
-            details_by_column[best_source].update(
-                {
-                    "target_field": target_field,
-                    "confidence": best_score,
-                    "needs_review": best_score < 1.0,
-                    "method": "pattern",
-                    "reason": f"Pattern match '{best_pattern}' ({best_score:.2f}).",
-                }
-            )
-            target_owner[target_field] = best_source
-            deterministic_suggestions[best_source] = {
-                "target_field": target_field,
-                "confidence": best_score,
-                "reason": f"Pattern '{best_pattern}'",
-            }
 
-    # 4) AI pass for semantic mapping and confidence scoring.
+def infer_column_mapping_detailed(
+    df: pd.DataFrame,
+    filename: Optional[str] = None,
+    sheet_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Infer column mappings with metadata for review workflows.
+
+    Returns one detail row per source column:
+      - source_column
+      - target_field
+      - confidence
+      - needs_review
+      - method (config|pattern|ai|unmapped)
+      - reason
+    """
+    cached_details, cached_owner, cached_suggestions = _infer_deterministic_mappings(
+        tuple(str(col) for col in df.columns), filename, sheet_name
+    )
+    if not cached_details:
+        return []
+
+    # Copy the cached result; the AI pass below mutates these in place.
+    details_by_column = {col: dict(detail) for col, detail in cached_details.items()}
+    column_order = list(details_by_column)
+    target_owner = dict(cached_owner)
+    deterministic_suggestions = {col: dict(item) for col, item in cached_suggestions.items()}
+
+    # 3) AI pass for semantic mapping and confidence scoring.
     should_call_ai = any(
         (not details_by_column[col]["target_field"]) or details_by_column[col]["confidence"] < 1.0
         for col in column_order
@@ -671,12 +876,17 @@ def infer_column_mapping_detailed(
             column_samples=_build_column_samples(df),
             deterministic_suggestions=deterministic_suggestions,
         )
-        ai_suggestions.sort(key=lambda item: float(item.get("confidence", 0.0)), reverse=True)
+        # Coerce confidence once, then keep only as many suggestions as there are columns.
+        for suggestion in ai_suggestions:
+            suggestion["confidence"] = float(suggestion.get("confidence", 0.0))
+        ai_suggestions = heapq.nlargest(
+            len(column_order), ai_suggestions, key=lambda item: item["confidence"]
+        )
 
         for suggestion in ai_suggestions:
             source_column = str(suggestion.get("source_column", ""))
             target_field = str(suggestion.get("target_field", ""))
-            confidence = float(suggestion.get("confidence", 0.0))
+            confidence = suggestion["confidence"]
             reason = str(suggestion.get("reason", "")).strip()
 
             if (
@@ -770,17 +980,9 @@ def infer_column_mapping(
 def infer_source_type(filename: str) -> Optional[str]:
     """Infer source type (e.g., DC name) from filename."""
     filename_upper = filename.upper()
-    
-    # Common patterns
-    if "CLG" in filename_upper or "CALGARY" in filename_upper or "CGY" in filename_upper:
-        return "Calgary DC export"
-    elif "SCARB" in filename_upper or "SC-" in filename_upper:
-        return "Scarborough DC export"
-    elif "TORONTO" in filename_upper or "TOR" in filename_upper:
-        return "Toronto DC export"
-    elif "MONTREAL" in filename_upper or "MTL" in filename_upper:
-        return "Montreal DC export"
-    
+    for pattern, source_type in _SOURCE_TYPE_PATTERNS:
+        if pattern.search(filename_upper):
+            return source_type
     return None
 
 
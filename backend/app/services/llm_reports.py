@@ -1,23 +1,39 @@
 """
 LLM integration for report generation.
 """
+import hashlib
 import json
 import os
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func
 from uuid import UUID
 from openai import OpenAI
 import time
 import logging
 from app.models import AuditRun, LaneStat, AuditResult, Shipment
-from app.services.audit_engine import get_exceptions
+from app.services.audit_engine import OUTLIER_LIMIT
 from app.services.report_context import build_report_context
 
 # Lazy initialization of OpenAI client
 _openai_client = None
 logger = logging.getLogger(__name__)
 
+LLM_MODEL = "gpt-4"
+LLM_CONTEXT_WINDOW_TOKENS = 8192
+LLM_CONTEXT_LIST_LIMIT = 20
+ANSWER_MAX_TOKENS = 800
+# Timestamps that change every call would defeat the response cache
+_VOLATILE_CONTEXT_KEYS = {"generated_at"}
+
+# In-process cache of completed LLM responses keyed by prompt hash
+_RESPONSE_CACHE: Dict[str, Tuple[datetime, str]] = {}
+_RESPONSE_CACHE_LOCK = Lock()
+_RESPONSE_CACHE_TTL = timedelta(days=7)
+_RESPONSE_CACHE_MAX_ENTRIES = 256
+
 def get_openai_client():
     """Get or initialize OpenAI client lazily."""
     global _openai_client
@@ -33,16 +49,8 @@ def get_openai_client():
     return _openai_client if _openai_client is not False else None
 
 
-def generate_executive_summary(db: Session, audit_run_id: UUID) -> str:
-    """
-    Generate executive summary using ChatGPT.
-    Returns markdown-formatted summary.
-    """
-    client = get_openai_client()
-    if not client:
-        return "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-    
-    start_time = time.perf_counter()
+def _build_executive_summary_prompt(db: Session, audit_run_id: UUID) -> str:
+    """Load audit metrics and render the executive summary prompt."""
     # Load audit run and related data
     audit_run = db.query(AuditRun).filter(AuditRun.id == audit_run_id).first()
     if not audit_run:
@@ -55,25 +63,25 @@ def generate_executive_summary(db: Session, audit_run_id: UUID) -> str:
         LaneStat.audit_run_id == audit_run_id
     ).order_by(LaneStat.theoretical_savings.desc()).limit(10).all()
     
-    # Get exception counts
-    exceptions = get_exceptions(db, audit_run_id, "all")
-    zero_charge_count = sum(1 for e in exceptions if "ZERO_CHARGE" in e.get("flags", []))
-    outlier_count = len(get_exceptions(db, audit_run_id, "outliers"))
-    
-    # Get tariff-based savings if available
-    total_tariff_savings = db.query(func.sum(AuditResult.savings_vs_actual)).join(
-        Shipment, AuditResult.shipment_id == Shipment.id
-    ).filter(
-        Shipment.audit_run_id == audit_run_id,
-        AuditResult.savings_vs_actual.isnot(None)
-    ).scalar() or 0
-    
-    rerated_count = db.query(func.count(AuditResult.id)).join(
+    # Exception counts and tariff re-rating totals in one aggregate round-trip
+    (
+        total_tariff_savings,
+        rerated_count,
+        zero_charge_count,
+        outlier_count,
+    ) = db.query(
+        func.sum(AuditResult.savings_vs_actual),
+        func.count(case((AuditResult.best_carrier.isnot(None), 1))),
+        func.count(case((AuditResult.flags.any("ZERO_CHARGE"), 1))),
+        func.count(case((AuditResult.cost_per_lb > 0, 1))),
+    ).join(
         Shipment, AuditResult.shipment_id == Shipment.id
     ).filter(
-        Shipment.audit_run_id == audit_run_id,
-        AuditResult.best_carrier.isnot(None)
-    ).scalar() or 0
+        Shipment.audit_run_id == audit_run_id
+    ).one()
+    total_tariff_savings = total_tariff_savings or 0
+    # get_exceptions(..., "outliers") reports at most the top 50
+    outlier_count = min(outlier_count, OUTLIER_LIMIT)
     
     # Build prompt
     prompt = f"""You are a freight audit analyst for 3PL Links, a logistics company providing freight audit services.
@@ -123,24 +131,119 @@ Please generate a concise executive summary that:
 5. Uses professional business language suitable for C-level executives
 
 Format the response in markdown with clear sections and bullet points."""
+    return prompt
+
+
+def _response_cache_key(
+    messages: List[Dict[str, str]], temperature: float, max_tokens: int
+) -> str:
+    raw = json.dumps([LLM_MODEL, temperature, max_tokens, messages], separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
 
+
+def _get_cached_response(key: str) -> Optional[str]:
+    with _RESPONSE_CACHE_LOCK:
+        cached = _RESPONSE_CACHE.get(key)
+        if cached is None:
+            return None
+        stored_at, content = cached
+        if datetime.utcnow() - stored_at > _RESPONSE_CACHE_TTL:
+            del _RESPONSE_CACHE[key]
+            return None
+        return content
+
+
+def _store_cached_response(key: str, content: str) -> None:
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE.pop(key, None)
+        _RESPONSE_CACHE[key] = (datetime.utcnow(), content)
+        while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order, so the first key is the oldest entry.
+            del _RESPONSE_CACHE[next(iter(_RESPONSE_CACHE))]
+
+
+def _stream_chat_completion(
+    client: OpenAI,
+    *,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    error_prefix: str,
+    description: str,
+    start_time: float,
+) -> Iterator[str]:
+    """
+    Yield completion text deltas as they arrive; errors are yielded as text.
+    Completed responses are cached by prompt hash, so an identical prompt
+    (same audit data and question) is answered without calling OpenAI.
+    """
+    cache_key = _response_cache_key(messages, temperature, max_tokens)
+    cached = _get_cached_response(cache_key)
+    if cached is not None:
+        logger.info("Serving cached %s", description)
+        yield cached
+        return
+
+    parts: List[str] = []
     try:
         response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a professional freight audit analyst. Generate clear, actionable executive summaries."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000,
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
         )
-        
-        content = response.choices[0].message.content
-        duration = round(time.perf_counter() - start_time, 3)
-        logger.info("Generated executive summary for audit %s in %.2fs", audit_run_id, duration)
-        return content
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        _store_cached_response(cache_key, "".join(parts))
     except Exception as e:
-        return f"Error generating summary: {str(e)}"
+        yield f"{error_prefix}: {str(e)}"
+    finally:
+        duration = round(time.perf_counter() - start_time, 3)
+        logger.info("Generated %s in %.2fs", description, duration)
+
+
+def sse_events(chunks: Iterator[str]) -> Iterator[str]:
+    """Frame text chunks as server-sent events, ending with a `done` event."""
+    for chunk in chunks:
+        yield f"data: {json.dumps({'delta': chunk})}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+
+def generate_executive_summary_stream(db: Session, audit_run_id: UUID) -> Iterator[str]:
+    """
+    Stream the executive summary as markdown text chunks.
+    Database work happens before the first chunk, so a missing audit run
+    raises ValueError immediately rather than mid-stream.
+    """
+    client = get_openai_client()
+    if not client:
+        return iter(["OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."])
+
+    start_time = time.perf_counter()
+    prompt = _build_executive_summary_prompt(db, audit_run_id)
+    return _stream_chat_completion(
+        client,
+        messages=[
+            {"role": "system", "content": "You are a professional freight audit analyst. Generate clear, actionable executive summaries."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=2000,
+        error_prefix="Error generating summary",
+        description=f"executive summary for audit {audit_run_id}",
+        start_time=start_time,
+    )
+
+
+def generate_executive_summary(db: Session, audit_run_id: UUID) -> str:
+    """
+    Generate executive summary using ChatGPT.
+    Returns markdown-formatted summary.
+    """
+    return "".join(generate_executive_summary_stream(db, audit_run_id))
 
 
 def generate_detailed_audit_report(db: Session, audit_run_id: UUID) -> str:
@@ -157,16 +260,39 @@ def generate_detailed_audit_report(db: Session, audit_run_id: UUID) -> str:
     return "Detailed audit report generation - to be implemented"
 
 
-def answer_audit_question(db: Session, audit_run_id: UUID, question: str) -> str:
+def _compact_context(value: Any) -> Any:
     """
-    Answer ad-hoc questions about a specific audit run using report context.
+    Shrink report context for the LLM: drop nulls and volatile keys, and keep
+    only the first LLM_CONTEXT_LIST_LIMIT entries of each list (lists from
+    build_report_context are already ordered by importance).
+    """
+    if isinstance(value, dict):
+        return {
+            key: _compact_context(item)
+            for key, item in value.items()
+            if item is not None and key not in _VOLATILE_CONTEXT_KEYS
+        }
+    if isinstance(value, list):
+        return [_compact_context(item) for item in value[:LLM_CONTEXT_LIST_LIMIT]]
+    return value
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English/JSON)."""
+    return len(text) // 4 + 1
+
+
+def answer_audit_question_stream(db: Session, audit_run_id: UUID, question: str) -> Iterator[str]:
+    """
+    Stream an answer to an ad-hoc question about a specific audit run using report context.
     """
     client = get_openai_client()
     if not client:
-        return "OpenAI API key not configured. Please set OPENAI_API_KEY."
-    
+        return iter(["OpenAI API key not configured. Please set OPENAI_API_KEY."])
+
+    start_time = time.perf_counter()
     context = build_report_context(db, audit_run_id)
-    payload = json.dumps(context, indent=2)
+    payload = json.dumps(_compact_context(context), separators=(",", ":"), default=str)
     
     prompt = f"""You are a freight optimization analyst at 3PL Links.
 Use the following JSON context about an audit to answer the user's question.
@@ -181,19 +307,25 @@ QUESTION:
 
 Respond with 2-3 concise paragraphs or bullet points, focusing only on information grounded in the context."""
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a senior freight audit analyst who provides precise, data-backed answers using supplied context only.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=800,
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating AI response: {str(e)}"
+    return _stream_chat_completion(
+        client,
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a senior freight audit analyst who provides precise, data-backed answers using supplied context only.",
+            },
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.3,
+        max_tokens=max(1, min(ANSWER_MAX_TOKENS, LLM_CONTEXT_WINDOW_TOKENS - _estimate_tokens(prompt))),
+        error_prefix="Error generating AI response",
+        description=f"audit question answer for audit {audit_run_id}",
+        start_time=start_time,
+    )
+
+
+def answer_audit_question(db: Session, audit_run_id: UUID, question: str) -> str:
+    """
+    Answer ad-hoc questions about a specific audit run using report context.
+    """
+    return "".join(answer_audit_question_stream(db, audit_run_id, question)).strip()
@@ -1,180 +1,286 @@
 """
 Data normalization service - converts raw DataFrame rows to Shipment model.
 """
+import math
+import re
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
 from typing import Dict, Optional, Any, List
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from app.services.file_parser import normalize_province_to_region
+from app.config.mapping_loader import get_default_region, get_province_region_map
 
+_MONEY_CHARS_RE = re.compile(r"[$,\s]")
+_PAREN_NEGATIVE_RE = re.compile(r"^\((.*)\)$")
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
 
-def normalize_row(
-    row: pd.Series,
+
+def _sanitize_raw(value: Any) -> Any:
+    """Replace missing values (NaN/NaT/NA) with None, recursing into dicts and lists."""
+    value_type = type(value)
+    if value_type is dict:
+        return {k: _sanitize_raw(v) for k, v in value.items()}
+    if value_type is list:
+        return [_sanitize_raw(v) for v in value]
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (float, np.floating)) and value != value:
+        return None
+    return value
+
+
+def _to_list(series: pd.Series) -> List[Any]:
+    """Convert a Series to a Python list with missing values as None."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _text_column(series: Optional[pd.Series], upper: bool = False) -> Optional[pd.Series]:
+    """Strip (and optionally uppercase) a text column; blanks become missing."""
+    if series is None:
+        return None
+    text = series.astype(str).str.strip()
+    if upper:
+        text = text.str.upper()
+    return text.where(series.notna() & (text != ""))
+
+
+def _parse_decimal_text(text: str) -> Optional[Decimal]:
+    """Parse already-cleaned numeric text; non-finite or invalid values become None."""
+    if not text:
+        return None
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return None
+    return value if value.is_finite() else None
+
+
+def _clean_money_text(text: str) -> str:
+    text = _MONEY_CHARS_RE.sub("", text)
+    return _PAREN_NEGATIVE_RE.sub(r"-\1", text)
+
+
+def _parse_money_text(text: str) -> Optional[Decimal]:
+    """Plain numeric text parses directly; only values that fail get regex-cleaned."""
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return _parse_decimal_text(_clean_money_text(text))
+    return value if value.is_finite() else None
+
+
+def _safe_decimal(val: Any) -> Optional[Decimal]:
+    """
+    Safely convert a single value to Decimal.
+
+    Numbers take a fast path; strings handle common freight file formats like:
+    - "1,234.56"
+    - "$1,234.56"
+    - "(1,234.56)" for negatives
+    """
+    if val is None or isinstance(val, bool):
+        return None
+    if isinstance(val, Decimal):
+        return val if val.is_finite() else None
+    if isinstance(val, (int, np.integer)):
+        return Decimal(int(val))
+    if isinstance(val, (float, np.floating)):
+        return Decimal(repr(float(val))) if math.isfinite(val) else None
+    return _parse_money_text(str(val))
+
+
+def _decimal_column(series: Optional[pd.Series]) -> Optional[List[Any]]:
+    """Convert a column to Decimals (see _safe_decimal for accepted formats)."""
+    if series is None:
+        return None
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return [_safe_decimal(val) for val in series.tolist()]
+    return [
+        _parse_money_text(val) if present else None
+        for val, present in zip(series.astype(str).tolist(), series.notna().tolist())
+    ]
+
+
+def _detect_date_format(sample: str) -> Optional[str]:
+    """Return the first known strptime format that parses `sample`, if any."""
+    for fmt in _DATE_FORMATS:
+        try:
+            datetime.strptime(sample, fmt)
+        except ValueError:
+            continue
+        return fmt
+    return None
+
+
+def _date_column(series: Optional[pd.Series]) -> Optional[pd.Series]:
+    """Parse string/datetime values to dates; other types (e.g. numbers) are dropped."""
+    if series is None:
+        return None
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        parseable = series.map(lambda val: isinstance(val, (str, datetime)) and bool(val))
+        series = series.where(parseable.astype(bool))
+        # Dates within a file almost always share one format; detect it from the
+        # first string so pandas can skip per-value format inference.
+        sample = next((val for val in series if isinstance(val, str)), None)
+        fmt = _detect_date_format(sample.strip()) if sample is not None else None
+        if fmt is not None:
+            parsed = pd.to_datetime(series, errors="coerce", format=fmt)
+            retry = parsed.isna() & series.notna()
+            if retry.any():
+                parsed[retry] = pd.to_datetime(series[retry], errors="coerce", format="mixed")
+            series = parsed
+        else:
+            series = pd.to_datetime(series, errors="coerce", format="mixed")
+    return series.dt.date
+
+
+def build_target_index(mappings: Dict[str, str]) -> Dict[str, str]:
+    """
+    Invert source_column -> target_field mappings to target_field -> source_column.
+    The first source column mapped to each target wins, matching dict order.
+    """
+    target_to_source: Dict[str, str] = {}
+    for src_col, tgt_field in mappings.items():
+        target_to_source.setdefault(tgt_field, src_col)
+    return target_to_source
+
+
+def normalize_dataframe(
+    df: pd.DataFrame,
     mappings: Dict[str, str],
     source_file_id: str,
     audit_run_id: str,
-    raw_data: Optional[Dict[str, Any]] = None
-) -> Dict[str, Any]:
+    target_to_source: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
     """
-    Normalize a single row from source file to shipment data.
-    
+    Normalize every row of a source DataFrame to shipment data using column ops.
+
     Args:
-        row: pandas Series representing one row
+        df: source DataFrame
         mappings: dict mapping source_column -> target_field
         source_file_id: UUID of source file
         audit_run_id: UUID of audit run
-        raw_data: optional dict of all original row data
-    
+        target_to_source: optional build_target_index(mappings), for callers
+            normalizing many frames with the same mappings
+
     Returns:
-        dict with normalized shipment fields
+        list of dicts with normalized shipment fields, one per row
     """
-    def sanitize_raw(value):
-        if isinstance(value, dict):
-            return {k: sanitize_raw(v) for k, v in value.items()}
-        if isinstance(value, list):
-            return [sanitize_raw(v) for v in value]
-        try:
-            if pd.isna(value):
-                return None
-        except TypeError:
-            # pd.isna raises TypeError for some objects (e.g., dicts) – just return value
-            pass
-        return value
-    
-    raw_dict = raw_data or row.to_dict()
-    result = {
-        "source_file_id": source_file_id,
-        "audit_run_id": audit_run_id,
-        "raw_data": sanitize_raw(raw_dict),
-    }
-    
-    # Helper to safely get value
-    def get_value(field_name: str, default=None, aliases: Optional[List[str]] = None):
-        search_fields = [field_name] + (aliases or [])
-        source_col = None
-        for candidate in search_fields:
-            for src_col, tgt_field in mappings.items():
-                if tgt_field == candidate:
-                    source_col = src_col
-                    break
+    if target_to_source is None:
+        target_to_source = build_target_index(mappings)
+
+    def get_column(field_name: str, aliases: Optional[List[str]] = None) -> Optional[pd.Series]:
+        for candidate in [field_name] + (aliases or []):
+            source_col = target_to_source.get(candidate)
             if source_col:
-                break
-        
-        if source_col and source_col in row.index:
-            val = row[source_col]
-            # Handle pandas NaN
-            if pd.isna(val):
-                return default
-            return val
-        return default
-    
-    def norm_text(val):
-        """Normalize text: strip whitespace, uppercase for matching."""
-        if val is None:
-            return None
-        s = str(val).strip()
-        return s if s else None
-    
-    def norm_text_upper(val):
-        """Normalize text and uppercase for city/province matching."""
-        if val is None:
-            return None
-        s = str(val).strip().upper()
-        return s if s else None
-    
-    # Normalize each field
-    result["shipment_ref"] = norm_text(get_value("shipment_ref", ""))
-    
-    # Origin - uppercase for consistency
-    result["origin_city"] = norm_text_upper(get_value("origin_city", ""))
-    result["origin_province"] = norm_text_upper(get_value("origin_province", ""))
-    result["origin_postal"] = norm_text_upper(get_value("origin_postal", ""))
-    
-    # Destination - uppercase for tariff lane matching
-    result["dest_city"] = norm_text_upper(get_value("dest_city", ""))
-    result["dest_province"] = norm_text_upper(get_value("dest_province", ""))
-    result["dest_postal"] = norm_text_upper(get_value("dest_postal", ""))
-    result["dest_region"] = normalize_province_to_region(result["dest_province"])
-    
-    # Dates
-    ship_date = get_value("ship_date")
-    if ship_date:
-        if isinstance(ship_date, str):
-            try:
-                result["ship_date"] = pd.to_datetime(ship_date).date()
-            except:
-                result["ship_date"] = None
-        elif isinstance(ship_date, (datetime, pd.Timestamp)):
-            result["ship_date"] = ship_date.date() if hasattr(ship_date, 'date') else None
-        else:
-            result["ship_date"] = None
+                return df[source_col] if source_col in df.columns else None
+        return None
+
+    columns: Dict[str, Any] = {}
+    columns["shipment_ref"] = _text_column(get_column("shipment_ref"))
+
+    # Origin / destination - uppercase for tariff lane matching
+    for field_name in (
+        "origin_city",
+        "origin_province",
+        "origin_postal",
+        "dest_city",
+        "dest_province",
+        "dest_postal",
+    ):
+        columns[field_name] = _text_column(get_column(field_name), upper=True)
+
+    dest_province = columns["dest_province"]
+    if dest_province is not None:
+        regions = dest_province.map(get_province_region_map())
+        default_region = get_default_region()
+        if default_region is not None:
+            regions = regions.fillna(default_region)
+        columns["dest_region"] = regions.where(dest_province.notna())
     else:
-        result["ship_date"] = None
-    
-    # Numeric fields
-    def safe_decimal(val, default=None):
-        """
-        Safely convert a value to Decimal.
-        
-        Handles common freight file formats like:
-        - "1,234.56"
-        - "$1,234.56"
-        - "(1,234.56)" for negatives
-        """
-        if val is None or pd.isna(val):
-            return default
-        try:
-            if isinstance(val, str):
-                s = val.strip()
-                if not s:
-                    return default
-                # Handle negatives in parentheses: (123.45) -> -123.45
-                negative = False
-                if s.startswith("(") and s.endswith(")"):
-                    negative = True
-                    s = s[1:-1]
-                # Remove currency symbols and thousands separators
-                for ch in ["$", ","]:
-                    s = s.replace(ch, "")
-                s = s.strip()
-                if negative:
-                    s = "-" + s
-                val = s
-            return Decimal(str(val))
-        except (InvalidOperation, ValueError, TypeError):
-            return default
-    
-    result["pallets"] = safe_decimal(get_value("pallets", aliases=["pieces"]))
-    
+        columns["dest_region"] = None
+
+    columns["ship_date"] = _date_column(get_column("ship_date"))
+
+    columns["pallets"] = _decimal_column(get_column("pallets", aliases=["pieces"]))
+
     # Weight fields:
     # - weight = INVWGT (scale/actual weight)
     # - dim_weight = PRBWGT (billed weight - what carrier charges on)
     # The rating engine uses max(weight, dim_weight) for CWT calculations
-    result["weight"] = safe_decimal(get_value("weight", aliases=["scale_weight"]))
-    
-    # PRBWGT (billed weight) maps to dim_weight in our model
-    # This is the weight the carrier actually used for rating
-    # Try billed_weight first (from PRBWGT), then fall back to dim_weight
-    billed = get_value("billed_weight")
-    if billed is None:
-        billed = get_value("dim_weight")
-    result["dim_weight"] = safe_decimal(billed)
-    
-    result["actual_charge"] = safe_decimal(get_value("charge", aliases=["actual_charge"]))
-    
-    # Carrier
-    result["carrier"] = str(get_value("carrier", "")).strip() or None
-    
+    columns["weight"] = _decimal_column(get_column("weight", aliases=["scale_weight"]))
+
+    # PRBWGT (billed weight) maps to dim_weight in our model; fall back to
+    # dim_weight per row where billed weight is missing.
+    billed = get_column("billed_weight")
+    dim = get_column("dim_weight")
+    if billed is not None and dim is not None:
+        billed = billed.where(billed.notna(), dim)
+    columns["dim_weight"] = _decimal_column(billed if billed is not None else dim)
+
+    columns["actual_charge"] = _decimal_column(get_column("charge", aliases=["actual_charge"]))
+
+    columns["carrier"] = _text_column(get_column("carrier"))
+
     # Origin DC - derive from shipper city (SHCITY)
     # Common values: TOR, SCARB, BRAMP, NIAGARA, RICHMOND, CALGARY, etc.
-    origin_city = result.get("origin_city")
-    if origin_city:
-        # Map common city names/abbreviations to DC codes
-        origin_dc = _infer_origin_dc(origin_city)
-        result["origin_dc"] = origin_dc
+    origin_city = columns["origin_city"]
+    if origin_city is not None:
+        columns["origin_dc"] = infer_origin_dc_series(origin_city)
     else:
-        result["origin_dc"] = None
-    
+        columns["origin_dc"] = None
+
+    row_count = len(df.index)
+    field_names = list(columns)
+    field_values = [
+        [None] * row_count if values is None else (values if isinstance(values, list) else _to_list(values))
+        for values in columns.values()
+    ]
+    raw_records = df.astype(object).where(df.notna(), None).to_dict("records")
+
+    results: List[Dict[str, Any]] = []
+    for raw, row_values in zip(raw_records, zip(*field_values)):
+        result = {
+            "source_file_id": source_file_id,
+            "audit_run_id": audit_run_id,
+            "raw_data": raw,
+        }
+        result.update(zip(field_names, row_values))
+        results.append(result)
+    return results
+
+
+def normalize_row(
+    row: pd.Series,
+    mappings: Dict[str, str],
+    source_file_id: str,
+    audit_run_id: str,
+    raw_data: Optional[Dict[str, Any]] = None,
+    target_to_source: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Normalize a single row from source file to shipment data.
+
+    Thin wrapper over normalize_dataframe for single-row callers.
+
+    Args:
+        row: pandas Series representing one row
+        mappings: dict mapping source_column -> target_field
+        source_file_id: UUID of source file
+        audit_run_id: UUID of audit run
+        raw_data: optional dict of all original row data
+        target_to_source: optional build_target_index(mappings), so row loops
+            invert the mappings once instead of once per row
+
+    Returns:
+        dict with normalized shipment fields
+    """
+    result = normalize_dataframe(
+        row.to_frame().T, mappings, source_file_id, audit_run_id, target_to_source
+    )[0]
+    if raw_data is not None:
+        result["raw_data"] = _sanitize_raw(raw_data)
     return result
 
 
@@ -208,6 +314,33 @@ ORIGIN_DC_MAPPINGS = {
     "EDMONTON": "EDM",
 }
 
+# Read-only at runtime
+ORIGIN_DC_MAPPINGS = MappingProxyType(ORIGIN_DC_MAPPINGS)
+
+
+def _origin_dc_for(city_upper: str) -> str:
+    """
+    DC code for an uppercased, stripped city: exact mapping first, then the
+    first mapped name (in ORIGIN_DC_MAPPINGS order) contained in the city,
+    otherwise the city itself.
+    """
+    if city_upper in ORIGIN_DC_MAPPINGS:
+        return ORIGIN_DC_MAPPINGS[city_upper]
+    for key, dc_code in ORIGIN_DC_MAPPINGS.items():
+        if key in city_upper:
+            return dc_code
+    return city_upper
+
+
+def infer_origin_dc_series(cities: pd.Series) -> pd.Series:
+    """
+    Vectorized _infer_origin_dc: resolves each distinct city once and maps the
+    results back onto the column.
+    """
+    cities = cities.str.upper().str.strip()
+    dc_by_city = {city: _origin_dc_for(city) for city in cities.dropna().unique()}
+    return cities.map(dc_by_city)
+
 
 def _infer_origin_dc(origin_city: str) -> str:
     """
@@ -221,17 +354,8 @@ def _infer_origin_dc(origin_city: str) -> str:
     
     city_upper = origin_city.upper().strip()
     
-    # Check direct mapping
-    if city_upper in ORIGIN_DC_MAPPINGS:
-        return ORIGIN_DC_MAPPINGS[city_upper]
-    
-    # Check if city contains any of the mapped names
-    for key, dc_code in ORIGIN_DC_MAPPINGS.items():
-        if key in city_upper:
-            return dc_code
-    
-    # Return the city as-is if no mapping found
-    # This preserves the actual city name for lane statistics
-    return city_upper
+    # Direct mapping, then contained names; otherwise the city as-is, which
+    # preserves the actual city name for lane statistics
+    return _origin_dc_for(city_upper)
 
 
@@ -7,19 +7,34 @@ Key business rules (from TransX analyst model):
 3. Apply fuel/tax/margin multiplier: base * 1.53
 4. MIN charge always applies if linehaul < min
 """
-from decimal import Decimal, ROUND_CEILING
-from typing import Dict, Optional, Tuple, List
+import math
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Optional, Tuple, List
+
+import numpy as np
 
 from sqlalchemy.orm import Session
 
 from app.models import Shipment, Tariff
 from app.models.tariff import TariffType
-from app.services.tariff_cache import TariffLaneCache, get_tariff_cache
+from app.services.tariff_cache import MONEY_UNITS_PER_DOLLAR, TariffLaneCache, get_tariff_cache
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; rate_cwt_array falls back to NumPy masks
+    njit = None
 
 
 # Fuel surcharge (25%) + Tax surcharge (13%) + Margin (15%) = 53%
 # Final charge = base * 1.53
 FUEL_TAX_MARGIN_MULTIPLIER = Decimal("1.53")
+# Exact integer ratio (153/100) for rating in integer money units
+FUEL_TAX_MARGIN_RATIO = FUEL_TAX_MARGIN_MULTIPLIER.as_integer_ratio()
+_CENT = Decimal("0.01")
+# Marks "no charge" in int64 money-unit arrays
+NO_CHARGE_UNITS = np.iinfo(np.int64).min
+SKID_WEIGHT_CAP_LBS = 2000
 
 # Standard CWT weight break ranges (in lbs)
 # These match the TransX analyst's Excel model
@@ -31,16 +46,24 @@ CWT_BREAK_RANGES = [
     (Decimal("5000"), Decimal("10000"), "5000"), # 5000-9999 lb
     (Decimal("10000"), None, "10000"),          # 10000+ lb
 ]
+# The ranges are contiguous, so a weight's tier is the last one starting at or below it
+_CWT_BREAK_STARTS = tuple(start for start, _, _ in CWT_BREAK_RANGES)
 
 
 def _to_decimal(value) -> Optional[Decimal]:
     if value is None:
         return None
-    if isinstance(value, Decimal):
+    value_type = type(value)
+    if value_type is Decimal:
         return value
+    if value_type is int:
+        return Decimal(value)
+    if value_type is float:
+        # repr keeps the shortest round-trip digits rather than the binary expansion
+        return Decimal(repr(value)) if value == value else None
     try:
         return Decimal(str(value))
-    except:
+    except (InvalidOperation, ValueError, TypeError):
         return None
 
 
@@ -54,10 +77,19 @@ def _select_billable_weight(weight_value, dim_weight_value) -> Optional[Decimal]
     """
     weight = _to_decimal(weight_value)
     dim_weight = _to_decimal(dim_weight_value)
-    candidates = [w for w in [weight, dim_weight] if w and w > 0]
-    if not candidates:
-        return None
-    return max(candidates)
+    if weight and weight > 0:
+        return dim_weight if dim_weight and dim_weight > weight else weight
+    return dim_weight if dim_weight and dim_weight > 0 else None
+
+
+def _select_billable_weight_f(
+    weight: Optional[float], dim_weight: Optional[float]
+) -> Optional[float]:
+    """Float version of _select_billable_weight; None/NaN/non-positive are ignored."""
+    dim_ok = dim_weight is not None and dim_weight > 0
+    if weight is not None and weight > 0:
+        return dim_weight if dim_ok and dim_weight > weight else weight
+    return dim_weight if dim_ok else None
 
 
 def get_cwt_break_label(weight: Decimal) -> str:
@@ -66,20 +98,96 @@ def get_cwt_break_label(weight: Decimal) -> str:
     
     Returns the break label (e.g., "LTL", "500", "1000", etc.)
     """
-    for start, end, label in CWT_BREAK_RANGES:
-        if weight >= start:
-            if end is None or weight < end:
-                return label
-    return "10000"  # Fallback to heaviest tier
+    idx = bisect_right(_CWT_BREAK_STARTS, weight) - 1
+    if idx < 0:
+        return "10000"  # Fallback to heaviest tier
+    return CWT_BREAK_RANGES[idx][2]
 
 
-def rate_cwt_cached(
-    billable_weight: Optional[Decimal],
+def _to_float(value) -> Optional[float]:
+    """Decimal/number -> float, treating NaN as missing."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+def _units_to_dollars(base_units: int, apply_multiplier: bool) -> float:
+    """
+    Apply the multiplier to a charge in money units and round to cents with
+    round-half-even, matching Decimal.quantize on the exact value.
+    """
+    numerator, denominator = FUEL_TAX_MARGIN_RATIO if apply_multiplier else (1, 1)
+    divisor = denominator * (MONEY_UNITS_PER_DOLLAR // 100)
+    cents, remainder = divmod(base_units * numerator, divisor)
+    if 2 * remainder > divisor or (2 * remainder == divisor and cents % 2):
+        cents += 1
+    return cents / 100
+
+
+def _units_to_dollars_array(base_units: np.ndarray, apply_multiplier: bool) -> np.ndarray:
+    """Vector form of _units_to_dollars over an int64 array."""
+    numerator, denominator = FUEL_TAX_MARGIN_RATIO if apply_multiplier else (1, 1)
+    divisor = denominator * (MONEY_UNITS_PER_DOLLAR // 100)
+    cents, remainder = np.divmod(base_units * numerator, divisor)
+    cents += (2 * remainder > divisor) | ((2 * remainder == divisor) & (cents % 2 == 1))
+    return cents / 100
+
+
+def _cents_to_decimal(charge: Optional[float]) -> Optional[Decimal]:
+    if charge is None:
+        return None
+    return Decimal(str(charge)).quantize(_CENT)
+
+
+def _build_cwt_rater(lane_cache: TariffLaneCache) -> Callable[[float], Optional[int]]:
+    """
+    Build and cache a scalar rater specialized to one lane: it returns the base
+    charge (max(ceil(weight / 100) * rate, min_charge)) in money units, or None
+    when no break applies. Break data is bound as local tuples so a call does
+    no attribute lookups or NumPy dispatch.
+    """
+    starts = tuple(lane_cache.cwt_starts.tolist())
+    rate_units = tuple(lane_cache.cwt_rate_units.tolist())
+    min_units = lane_cache.min_charge_units
+    ceil = math.ceil
+
+    if not starts:
+        def rater(weight: float) -> Optional[int]:
+            return None
+    elif lane_cache.cwt_breaks_disjoint:
+        # Ranges don't overlap: the break is the last one starting at or below the weight
+        def rater(weight: float) -> Optional[int]:
+            idx = bisect_right(starts, weight) - 1
+            if idx < 0:
+                return None
+            return max(ceil(weight / 100) * rate_units[idx], min_units)
+    else:
+        breaks = tuple(zip(starts, lane_cache.cwt_ends.tolist(), rate_units))
+
+        # First break containing the weight, else the last break starting below it
+        def rater(weight: float) -> Optional[int]:
+            selected = None
+            for start, end, units in breaks:
+                if weight >= start:
+                    selected = units
+                    if weight < end:
+                        break
+            if selected is None:
+                return None
+            return max(ceil(weight / 100) * selected, min_units)
+
+    lane_cache.cwt_rater = rater
+    return rater
+
+
+def rate_cwt_cached_f(
+    billable_weight: Optional[float],
     lane_cache: TariffLaneCache,
     apply_multiplier: bool = True
-) -> Optional[Decimal]:
+) -> Optional[float]:
     """
-    Rate a shipment using CWT (hundredweight) tariff.
+    Rate a shipment using CWT (hundredweight) tariff without Decimal.
     
     Business rules:
     1. Compute CWT = ceil(weight / 100)
@@ -87,69 +195,39 @@ def rate_cwt_cached(
     3. linehaul = CWT * rate_per_cwt
     4. base_charge = max(linehaul, min_charge)
     5. final_charge = base_charge * 1.53 (fuel + tax + margin)
+    
+    Charges are computed in integer money units and returned rounded to cents.
     """
-    if not billable_weight or billable_weight <= 0:
+    if billable_weight is None or not billable_weight > 0:
         return None
 
-    # Compute CWT (hundredweight), rounded up
-    cwt = (billable_weight / Decimal("100")).to_integral_value(rounding=ROUND_CEILING)
-    
-    # Find the correct break based on weight tier
-    # The break ranges in tariff_cache should match CWT_BREAK_RANGES
-    selected_break = None
-    
-    for br in lane_cache.cwt_breaks:
-        # Check if weight falls within this break's range
-        start = br.start or Decimal("0")
-        end = br.end
-        
-        if billable_weight >= start:
-            if end is None or billable_weight < end:
-                selected_break = br
-                break
-    
-    # If no exact match, try to find the best break
-    if not selected_break and lane_cache.cwt_breaks:
-        # Sort breaks by start weight and find the appropriate one
-        sorted_breaks = sorted(lane_cache.cwt_breaks, key=lambda b: b.start or Decimal("0"))
-        
-        for br in sorted_breaks:
-            start = br.start or Decimal("0")
-            end = br.end
-            
-            if billable_weight >= start:
-                if end is None or billable_weight < end:
-                    selected_break = br
-                    break
-                # If weight exceeds this break's end, continue to next
-                selected_break = br  # Keep as fallback
-    
-    if not selected_break:
+    rater = lane_cache.cwt_rater or _build_cwt_rater(lane_cache)
+    base_units = rater(billable_weight)
+    if base_units is None:
         return None
-
-    # Calculate linehaul charge
-    linehaul = cwt * selected_break.rate_per_cwt
-    
-    # Apply minimum charge rule
-    base_charge = max(linehaul, lane_cache.min_charge)
     
     # Apply fuel/tax/margin multiplier (25% + 13% + 15% = 53%)
-    if apply_multiplier:
-        final_charge = base_charge * FUEL_TAX_MARGIN_MULTIPLIER
-    else:
-        final_charge = base_charge
-    
-    return final_charge.quantize(Decimal("0.01"))
+    return _units_to_dollars(base_units, apply_multiplier)
 
 
-def rate_skid_spot_cached(
-    pallets_value,
-    weight_value,
+def rate_cwt_cached(
+    billable_weight: Optional[Decimal],
     lane_cache: TariffLaneCache,
     apply_multiplier: bool = True
 ) -> Optional[Decimal]:
+    """Decimal wrapper around rate_cwt_cached_f for single-shipment rating."""
+    charge = rate_cwt_cached_f(_to_float(billable_weight), lane_cache, apply_multiplier)
+    return _cents_to_decimal(charge)
+
+
+def rate_skid_spot_cached_f(
+    pallets: Optional[float],
+    weight: Optional[float],
+    lane_cache: TariffLaneCache,
+    apply_multiplier: bool = True
+) -> Optional[float]:
     """
-    Rate a shipment using skid/spot tariff (e.g., APPS FAK).
+    Rate a shipment using skid/spot tariff (e.g., APPS FAK) without Decimal.
     
     Business rules:
     1. Round pallets up to get number of spots
@@ -157,32 +235,221 @@ def rate_skid_spot_cached(
     3. Look up spot charge
     4. Apply fuel/tax/margin multiplier
     """
-    pallets = _to_decimal(pallets_value) or Decimal("1")
-    num_spots = int(pallets.to_integral_value(rounding=ROUND_CEILING))
-    num_spots = max(1, num_spots)
-
-    weight = _to_decimal(weight_value)
-    # Weight cap: 2000 lb per skid
-    if weight and weight > Decimal("2000") * Decimal(num_spots):
+    if not lane_cache.skid_breaks_units:
         return None
 
-    if not lane_cache.skid_breaks:
+    num_spots = max(1, math.ceil(pallets)) if pallets else 1
+
+    # Weight cap: 2000 lb per skid, compared as plain numbers
+    if weight and weight > SKID_WEIGHT_CAP_LBS * num_spots:
         return None
 
-    max_spots = max(lane_cache.skid_breaks.keys())
-    spots_to_use = min(num_spots, max_spots)
-    base_charge = lane_cache.skid_breaks.get(spots_to_use)
+    max_spots = max(lane_cache.skid_breaks_units.keys())
+    base_units = lane_cache.skid_breaks_units.get(min(num_spots, max_spots))
     
-    if base_charge is None:
+    if base_units is None:
         return None
     
     # Apply fuel/tax/margin multiplier
-    if apply_multiplier:
-        final_charge = base_charge * FUEL_TAX_MARGIN_MULTIPLIER
+    return _units_to_dollars(base_units, apply_multiplier)
+
+
+def rate_skid_spot_cached(
+    pallets_value,
+    weight_value,
+    lane_cache: TariffLaneCache,
+    apply_multiplier: bool = True
+) -> Optional[Decimal]:
+    """Decimal wrapper around rate_skid_spot_cached_f for single-shipment rating."""
+    charge = rate_skid_spot_cached_f(
+        _to_float(_to_decimal(pallets_value)),
+        _to_float(_to_decimal(weight_value)),
+        lane_cache,
+        apply_multiplier,
+    )
+    return _cents_to_decimal(charge)
+
+
+def _rate_cwt_kernel(
+    weights: np.ndarray,
+    row_lanes: np.ndarray,
+    lane_offsets: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    rate_units: np.ndarray,
+    min_charge_units: np.ndarray,
+    no_charge: int,
+) -> np.ndarray:
+    """
+    Per-row CWT base charge loop for numba over many lanes at once. Lane k's
+    breaks are starts/ends/rate_units[lane_offsets[k]:lane_offsets[k + 1]]
+    (ends uses inf for open-ended breaks); rows with a negative lane are skipped.
+    """
+    base_units = np.full(weights.shape[0], no_charge, dtype=np.int64)
+    for i in range(weights.shape[0]):
+        lane = row_lanes[i]
+        weight = weights[i]
+        if lane < 0 or not weight > 0:
+            continue
+        # First break containing the weight, else the last break starting below it
+        selected = -1
+        for j in range(lane_offsets[lane], lane_offsets[lane + 1]):
+            if weight >= starts[j]:
+                selected = j
+                if weight < ends[j]:
+                    break
+        if selected < 0:
+            continue
+        base_units[i] = max(
+            np.int64(np.ceil(weight / 100)) * rate_units[selected], min_charge_units[lane]
+        )
+    return base_units
+
+
+_rate_cwt_jit = njit(cache=True)(_rate_cwt_kernel) if njit is not None else None
+
+
+def cwt_base_units_lanes(
+    billable_weights: np.ndarray, lane_rows: List[Tuple[np.ndarray, TariffLaneCache]]
+) -> np.ndarray:
+    """
+    Base CWT charges for shipments spread over several lanes of one tariff, given
+    (row indices, lane) pairs; rows not covered get NO_CHARGE_UNITS. With numba
+    all lanes are rated in a single kernel call.
+    """
+    if _rate_cwt_jit is None:
+        base_units = np.full(len(billable_weights), NO_CHARGE_UNITS, dtype=np.int64)
+        for rows, lane_cache in lane_rows:
+            base_units[rows] = cwt_base_units_array(billable_weights[rows], lane_cache)
+        return base_units
+
+    row_lanes = np.full(len(billable_weights), -1, dtype=np.int64)
+    for lane_idx, (rows, _) in enumerate(lane_rows):
+        row_lanes[rows] = lane_idx
+    lanes = [lane_cache for _, lane_cache in lane_rows]
+    lane_offsets = np.zeros(len(lanes) + 1, dtype=np.int64)
+    np.cumsum([len(lane_cache.cwt_starts) for lane_cache in lanes], out=lane_offsets[1:])
+    return _rate_cwt_jit(
+        np.ascontiguousarray(billable_weights, dtype=np.float64),
+        row_lanes,
+        lane_offsets,
+        np.concatenate([lane_cache.cwt_starts for lane_cache in lanes] or [np.empty(0)]),
+        np.concatenate([lane_cache.cwt_ends for lane_cache in lanes] or [np.empty(0)]),
+        np.concatenate(
+            [lane_cache.cwt_rate_units for lane_cache in lanes] or [np.empty(0, dtype=np.int64)]
+        ),
+        np.array([lane_cache.min_charge_units for lane_cache in lanes], dtype=np.int64),
+        NO_CHARGE_UNITS,
+    )
+
+
+def cwt_base_units_array(billable_weights: np.ndarray, lane_cache: TariffLaneCache) -> np.ndarray:
+    """
+    Base CWT charges (before the fuel/tax/margin multiplier) for many shipments
+    on one lane, in int64 money units; NO_CHARGE_UNITS where no charge applies.
+    """
+    breaks = lane_cache.cwt_breaks
+    if _rate_cwt_jit is not None and breaks:
+        return _rate_cwt_jit(
+            np.ascontiguousarray(billable_weights, dtype=np.float64),
+            np.zeros(len(billable_weights), dtype=np.int64),
+            np.array([0, len(breaks)], dtype=np.int64),
+            lane_cache.cwt_starts,
+            lane_cache.cwt_ends,
+            lane_cache.cwt_rate_units,
+            np.array([lane_cache.min_charge_units], dtype=np.int64),
+            NO_CHARGE_UNITS,
+        )
+
+    base_units = np.full(len(billable_weights), NO_CHARGE_UNITS, dtype=np.int64)
+    valid = billable_weights > 0  # False for NaN
+    if not breaks or not valid.any():
+        return base_units
+    weights = billable_weights[valid]
+
+    # First break containing the weight, else the last break starting below it
+    if lane_cache.cwt_breaks_disjoint:
+        selected = np.searchsorted(lane_cache.cwt_starts, weights, side="right") - 1
     else:
-        final_charge = base_charge
-    
-    return final_charge.quantize(Decimal("0.01"))
+        selected = np.full(len(weights), -1, dtype=np.int64)
+        fallback = np.full(len(weights), -1, dtype=np.int64)
+        for idx, br in enumerate(breaks):
+            started = weights >= br.start_f
+            fallback[started] = idx
+            contains = started if br.end_f is None else started & (weights < br.end_f)
+            selected[contains & (selected < 0)] = idx
+        selected = np.where(selected >= 0, selected, fallback)
+    rated = selected >= 0
+
+    cwt = np.ceil(weights[rated] / 100).astype(np.int64)
+    valid_units = np.full(len(weights), NO_CHARGE_UNITS, dtype=np.int64)
+    valid_units[rated] = np.maximum(
+        cwt * lane_cache.cwt_rate_units[selected[rated]], lane_cache.min_charge_units
+    )
+    base_units[valid] = valid_units
+    return base_units
+
+
+def skid_spot_base_units_array(
+    pallets: np.ndarray, weights: np.ndarray, lane_cache: TariffLaneCache
+) -> np.ndarray:
+    """
+    Base skid/spot charges (before the fuel/tax/margin multiplier) for many
+    shipments on one lane, in int64 money units; NO_CHARGE_UNITS where no charge applies.
+    """
+    base_units = np.full(len(pallets), NO_CHARGE_UNITS, dtype=np.int64)
+    if not lane_cache.skid_breaks_units:
+        return base_units
+
+    # Missing or zero pallets count as a single spot
+    num_spots = np.where(np.isnan(pallets) | (pallets == 0), 1, np.ceil(pallets))
+    num_spots = np.maximum(num_spots, 1).astype(np.int64)
+
+    max_spots = max(lane_cache.skid_breaks_units.keys())
+    spot_units = np.full(max_spots + 1, NO_CHARGE_UNITS, dtype=np.int64)
+    for spots, units in lane_cache.skid_breaks_units.items():
+        if spots >= 1:
+            spot_units[spots] = units
+
+    # Weight cap: 2000 lb per skid (NaN weights never exceed it)
+    rated = ~(weights > SKID_WEIGHT_CAP_LBS * num_spots)
+    base_units[rated] = spot_units[np.minimum(num_spots[rated], max_spots)]
+    return base_units
+
+
+def units_to_charges(base_units: np.ndarray, apply_multiplier: bool = True) -> np.ndarray:
+    """Apply the multiplier to base charge units and round to cents; NaN where no charge."""
+    charges = np.full(base_units.shape, np.nan)
+    rated = base_units != NO_CHARGE_UNITS
+    charges[rated] = _units_to_dollars_array(base_units[rated], apply_multiplier)
+    return charges
+
+
+def rate_cwt_array(
+    billable_weights: np.ndarray,
+    lane_cache: TariffLaneCache,
+    apply_multiplier: bool = True
+) -> np.ndarray:
+    """
+    Rate many shipments on one CWT lane at once; same rules as rate_cwt_cached_f.
+    Returns a float array with NaN where no charge applies.
+    """
+    return units_to_charges(cwt_base_units_array(billable_weights, lane_cache), apply_multiplier)
+
+
+def rate_skid_spot_array(
+    pallets: np.ndarray,
+    weights: np.ndarray,
+    lane_cache: TariffLaneCache,
+    apply_multiplier: bool = True
+) -> np.ndarray:
+    """
+    Rate many shipments on one skid/spot lane at once; same rules as
+    rate_skid_spot_cached_f. Returns a float array with NaN where no charge applies.
+    """
+    return units_to_charges(
+        skid_spot_base_units_array(pallets, weights, lane_cache), apply_multiplier
+    )
 
 
 def rate_shipment(
@@ -197,7 +464,7 @@ def rate_shipment(
         Expected charge or None if tariff doesn't apply
     """
     cache = get_tariff_cache(db)
-    entry = next((e for e in cache.entries if e.id == str(tariff.id)), None)
+    entry = cache.entries_by_id.get(str(tariff.id))
     if not entry:
         return None
     lane_cache = entry.find_lane(shipment.dest_city, shipment.dest_province)
@@ -223,30 +490,33 @@ def rerate_shipment_all_carriers(
         Dictionary mapping carrier_name -> expected_charge
     """
     cache = get_tariff_cache(db)
-    if tariffs is None:
-        entries = cache.entries
-    else:
+    origin_dc = shipment.origin_dc.upper().strip() if shipment.origin_dc else None
+    # Only tariffs from the shipment's origin can apply
+    entries = cache.entries_by_origin.get(origin_dc, []) if origin_dc else cache.entries
+    if tariffs is not None:
         allowed_ids = {str(tariff.id) for tariff in tariffs}
-        entries = [entry for entry in cache.entries if entry.id in allowed_ids]
+        entries = [entry for entry in entries if entry.id in allowed_ids]
 
     results: Dict[str, Decimal] = {}
-    origin_dc = shipment.origin_dc.upper().strip() if shipment.origin_dc else None
-    billable_weight = _select_billable_weight(shipment.weight, shipment.dim_weight)
-    pallets = _to_decimal(shipment.pallets)
-    scale_weight = _to_decimal(shipment.weight)
+    # Convert once; every tariff below rates from the same float inputs
+    scale_weight = _to_float(_to_decimal(shipment.weight))
+    billable_weight = _select_billable_weight_f(
+        scale_weight, _to_float(_to_decimal(shipment.dim_weight))
+    )
+    pallets = _to_float(_to_decimal(shipment.pallets))
+    city_key = shipment.dest_city.upper().strip() if shipment.dest_city else ""
+    prov_key = shipment.dest_province.upper().strip() if shipment.dest_province else ""
 
     for entry in entries:
-        if origin_dc and entry.origin_dc.upper().strip() != origin_dc:
-            continue
-        lane_cache = entry.find_lane(shipment.dest_city, shipment.dest_province)
+        lane_cache = entry.find_lane_normalized(city_key, prov_key)
         if not lane_cache:
             continue
         if entry.tariff_type == TariffType.CWT:
-            charge = rate_cwt_cached(billable_weight, lane_cache)
+            charge = rate_cwt_cached_f(billable_weight, lane_cache)
         else:
-            charge = rate_skid_spot_cached(pallets, scale_weight, lane_cache)
+            charge = rate_skid_spot_cached_f(pallets, scale_weight, lane_cache)
         if charge is not None:
-            results[entry.carrier_name] = charge
+            results[entry.carrier_name] = _cents_to_decimal(charge)
 
     return results
 
@@ -11,19 +11,23 @@ from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 import numpy as np
-import pandas as pd
 from sqlalchemy.orm import Session
 
 from app.models import Shipment
 from app.models.tariff import TariffType
 from app.services.rating_engine import (
-    _select_billable_weight,
     _to_decimal,
+    NO_CHARGE_UNITS,
+    cwt_base_units_lanes,
     rate_cwt_cached,
     rate_skid_spot_cached,
+    skid_spot_base_units_array,
+    units_to_charges,
 )
 from app.services.tariff_cache import TariffCacheEntry, get_tariff_cache
 
+_ZERO = Decimal("0")
+
 
 def _normalize(value: Optional[str]) -> str:
     return value.strip().upper() if value else ""
@@ -41,7 +45,6 @@ class ShipmentRecord:
     weight: Optional[Decimal]
     dim_weight: Optional[Decimal]
     actual_charge: Optional[Decimal]
-    billable_weight: Optional[Decimal]
 
     @property
     def origin_key(self) -> str:
@@ -92,52 +95,48 @@ class VectorizedRerateResult:
     consolidation_group_count: int
 
 
-def _records_to_dataframe(records: List[ShipmentRecord]) -> pd.DataFrame:
-    if not records:
-        return pd.DataFrame(
-            columns=[
-                "shipment_id",
-                "origin_dc",
-                "dest_city",
-                "dest_province",
-                "dest_region",
-                "ship_date",
-                "pallets",
-                "weight",
-                "billable_weight",
-                "actual_charge",
-            ]
-        )
+def _records_to_arrays(records: List[ShipmentRecord]) -> Dict[str, np.ndarray]:
+    """Columnar view of the fields rating needs; NaN marks a missing number."""
+    count = len(records)
+    origin_keys = np.empty(count, dtype=object)
+    city_keys = np.empty(count, dtype=object)
+    province_keys = np.empty(count, dtype=object)
+    pallets = np.full(count, np.nan)
+    weights = np.full(count, np.nan)
+    dim_weights = np.full(count, np.nan)
 
-    data = []
-    for rec in records:
-        data.append(
-            {
-                "shipment_id": rec.shipment_id,
-                "origin_dc": rec.origin_key,
-                "dest_city": rec.dest_city or "",
-                "dest_province": rec.dest_province or "",
-                "dest_region": rec.dest_region or "",
-                "ship_date": rec.ship_date,
-                "pallets": float(rec.pallets) if rec.pallets is not None else np.nan,
-                "weight": float(rec.weight) if rec.weight is not None else np.nan,
-                "billable_weight": float(rec.billable_weight)
-                if rec.billable_weight is not None
-                else np.nan,
-                "actual_charge": float(rec.actual_charge)
-                if rec.actual_charge is not None
-                else np.nan,
-            }
-        )
+    for idx, rec in enumerate(records):
+        origin_keys[idx] = rec.origin_key
+        city_keys[idx] = rec.dest_city_key
+        province_keys[idx] = rec.dest_province_key
+        if rec.pallets is not None:
+            pallets[idx] = float(rec.pallets)
+        if rec.weight is not None:
+            weights[idx] = float(rec.weight)
+        if rec.dim_weight is not None:
+            dim_weights[idx] = float(rec.dim_weight)
+
+    # Billable weight = larger of the positive scale and billed (dim) weights,
+    # as in _select_billable_weight; fmax ignores the NaN side.
+    billable_weights = np.fmax(
+        np.where(weights > 0, weights, np.nan),
+        np.where(dim_weights > 0, dim_weights, np.nan),
+    )
 
-    return pd.DataFrame(data)
+    return {
+        "origin_key": origin_keys,
+        "dest_city_key": city_keys,
+        "dest_province_key": province_keys,
+        "pallets": pallets,
+        "weight": weights,
+        "billable_weight": billable_weights,
+    }
 
 
 def _load_records(db: Session, audit_run_id: UUID) -> List[ShipmentRecord]:
     shipments = db.query(Shipment).filter(Shipment.audit_run_id == audit_run_id).all()
     records: List[ShipmentRecord] = []
     for shipment in shipments:
-        billable = _select_billable_weight(shipment.weight, shipment.dim_weight)
         records.append(
             ShipmentRecord(
                 shipment_id=str(shipment.id),
@@ -150,7 +149,6 @@ def _load_records(db: Session, audit_run_id: UUID) -> List[ShipmentRecord]:
                 weight=_to_decimal(shipment.weight),
                 dim_weight=_to_decimal(shipment.dim_weight),
                 actual_charge=_to_decimal(shipment.actual_charge),
-                billable_weight=billable,
             )
         )
     return records
@@ -166,97 +164,107 @@ def _filter_tariff_entries(
     return cache.entries
 
 
-def _compute_carrier_columns(
-    df: pd.DataFrame, records: List[ShipmentRecord], entries: List[TariffCacheEntry]
-) -> Tuple[List[str], Dict[str, str]]:
-    carrier_columns: List[str] = []
-    column_to_carrier: Dict[str, str] = {}
-
-    for entry in entries:
-        column_name = f"carrier_{entry.id}"
-        charges: List[float] = []
-        lane_lookup: Dict[Tuple[str, str], Optional[object]] = {}
-
-        for rec in records:
-            if rec.origin_key != _normalize(entry.origin_dc):
-                charges.append(np.nan)
-                continue
-
-            lane_key = (rec.dest_city_key, rec.dest_province_key)
-            if lane_key not in lane_lookup:
-                lane_lookup[lane_key] = entry.find_lane(rec.dest_city, rec.dest_province)
-            lane_cache = lane_lookup[lane_key]
+def _entry_base_units(
+    entry: TariffCacheEntry,
+    lanes: List[Tuple[str, str, np.ndarray]],
+    arrays: Dict[str, np.ndarray],
+) -> np.ndarray:
+    """Base charge column for one tariff over its origin's (destination, rows) groups."""
+    lane_rows = []
+    for city_key, province_key, rows in lanes:
+        lane_cache = entry.find_lane_normalized(city_key, province_key)
+        if lane_cache:
+            lane_rows.append((rows, lane_cache))
+
+    if entry.tariff_type == TariffType.CWT:
+        return cwt_base_units_lanes(arrays["billable_weight"], lane_rows)
+    column = np.full(len(arrays["billable_weight"]), NO_CHARGE_UNITS, dtype=np.int64)
+    for rows, lane_cache in lane_rows:
+        column[rows] = skid_spot_base_units_array(
+            arrays["pallets"][rows], arrays["weight"][rows], lane_cache
+        )
+    return column
 
-            if not lane_cache:
-                charges.append(np.nan)
-                continue
 
-            if entry.tariff_type == TariffType.CWT:
-                charge = rate_cwt_cached(rec.billable_weight, lane_cache)
-            else:
-                charge = rate_skid_spot_cached(rec.pallets, rec.weight, lane_cache)
+def _compute_carrier_charges(
+    arrays: Dict[str, np.ndarray], entries: List[TariffCacheEntry]
+) -> np.ndarray:
+    """Charge matrix of shape (shipments, entries), NaN where a tariff does not apply."""
+    # Base charges in money units; the multiplier and rounding run once at the end
+    base_units = np.full(
+        (len(arrays["billable_weight"]), len(entries)), NO_CHARGE_UNITS, dtype=np.int64
+    )
 
-            charges.append(float(charge) if charge is not None else np.nan)
+    # Group rows by (origin, destination) once; every tariff then resolves each
+    # distinct destination for its origin a single time and rates it as a block.
+    rows_by_lane: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+    for idx, key in enumerate(
+        zip(arrays["origin_key"], arrays["dest_city_key"], arrays["dest_province_key"])
+    ):
+        rows_by_lane[key].append(idx)
+    lanes_by_origin: Dict[str, List[Tuple[str, str, np.ndarray]]] = defaultdict(list)
+    for (origin_key, city_key, province_key), rows in rows_by_lane.items():
+        lanes_by_origin[origin_key].append((city_key, province_key, np.array(rows)))
 
-        df[column_name] = charges
-        carrier_columns.append(column_name)
-        column_to_carrier[column_name] = entry.carrier_name
+    for col_idx, entry in enumerate(entries):
+        lanes = lanes_by_origin.get(entry.origin_norm)
+        if lanes:
+            base_units[:, col_idx] = _entry_base_units(entry, lanes, arrays)
 
-    return carrier_columns, column_to_carrier
+    return units_to_charges(base_units)
 
 
 def _build_shipment_updates(
-    df: pd.DataFrame,
     records: List[ShipmentRecord],
-    carrier_columns: List[str],
-    column_to_carrier: Dict[str, str],
+    charges: np.ndarray,
+    carrier_names: List[str],
 ) -> Tuple[List[ShipmentRatingUpdate], Decimal, Decimal, int]:
     updates: List[ShipmentRatingUpdate] = []
-    carrier_savings_total = Decimal("0")
-    best_charge_total = Decimal("0")
+    carrier_savings_total = _ZERO
+    best_charge_total = _ZERO
     rerated_count = 0
 
-    if not carrier_columns:
+    if not carrier_names:
         return updates, carrier_savings_total, best_charge_total, rerated_count
 
-    for idx, rec in enumerate(records):
-        row = df.iloc[idx]
-        best_charge_float: Optional[float] = None
-        best_carrier_col: Optional[str] = None
-
-        for col in carrier_columns:
-            value = row[col]
-            if np.isnan(value):
-                continue
-            if best_charge_float is None or value < best_charge_float:
-                best_charge_float = value
-                best_carrier_col = col
-
-        expected_charge_per_carrier: Dict[str, float] = {}
-        for col, carrier_name in column_to_carrier.items():
-            value = row[col]
-            if np.isnan(value):
-                continue
-            expected_charge_per_carrier[carrier_name] = round(float(value), 2)
+    missing = np.isnan(charges)
+    has_charge = ~missing.all(axis=1)
+    # argmin returns the first minimum, so ties go to the earliest tariff
+    best_idx = np.argmin(np.where(missing, np.inf, charges), axis=1)
+    best_values = charges[np.arange(len(charges)), best_idx]
+    rounded_charges = np.round(charges, 2)
+    # Charges are whole cents already; keep the best ones as int64 cents and
+    # build each Decimal from them, without a float -> str -> Decimal trip
+    best_cents = np.rint(np.where(has_charge, best_values, 0) * 100).astype(np.int64)
+    rerated_count = int(has_charge.sum())
+    best_charge_total = _from_cents(int(best_cents.sum()))
 
+    for idx, rec in enumerate(records):
         best_charge_decimal: Optional[Decimal] = None
-        savings = Decimal("0")
-        if best_charge_float is not None:
-            best_charge_decimal = Decimal(str(round(best_charge_float, 4)))
-            actual = rec.actual_charge or Decimal("0")
-            if actual > 0 and best_charge_decimal is not None:
+        best_carrier: Optional[str] = None
+        if has_charge[idx]:
+            best_charge_decimal = _from_cents(best_cents[idx])
+            best_carrier = carrier_names[best_idx[idx]]
+
+        expected_charge_per_carrier: Dict[str, float] = {
+            carrier_names[col_idx]: float(rounded_charges[idx, col_idx])
+            for col_idx in np.flatnonzero(~missing[idx])
+        }
+
+        savings = _ZERO
+        if best_charge_decimal is not None:
+            actual = rec.actual_charge or _ZERO
+            if actual > 0:
                 diff = actual - best_charge_decimal
                 if diff > 0:
                     savings = diff
                     carrier_savings_total += diff
-            best_charge_total += best_charge_decimal
-            rerated_count += 1
 
         # Determine tariff match status
-        if best_charge_float is not None:
+        if best_charge_decimal is not None:
             tariff_match_status = "MATCHED"
             tariff_match_notes = None
-        elif not carrier_columns:
+        elif not carrier_names:
             tariff_match_status = "NO_TARIFF"
             tariff_match_notes = "No tariffs loaded for rating"
         else:
@@ -267,7 +275,7 @@ def _build_shipment_updates(
             ShipmentRatingUpdate(
                 shipment_id=rec.shipment_id,
                 expected_charge_per_carrier=expected_charge_per_carrier,
-                best_carrier=column_to_carrier.get(best_carrier_col) if best_carrier_col else None,
+                best_carrier=best_carrier,
                 best_charge=best_charge_decimal,
                 savings_vs_actual=savings,
                 tariff_match_status=tariff_match_status,
@@ -280,8 +288,8 @@ def _build_shipment_updates(
 
 def _best_consolidated_charge(
     origin_key: str,
-    dest_city: Optional[str],
-    dest_province: Optional[str],
+    city_key: str,
+    province_key: str,
     billable_weight: Optional[Decimal],
     pallets: Optional[Decimal],
     weight: Optional[Decimal],
@@ -292,7 +300,7 @@ def _best_consolidated_charge(
     best_carrier: Optional[str] = None
 
     for entry in entries:
-        lane_cache = entry.find_lane(dest_city, dest_province)
+        lane_cache = entry.find_lane_normalized(city_key, province_key)
         if not lane_cache:
             continue
         if entry.tariff_type == TariffType.CWT:
@@ -309,15 +317,27 @@ def _best_consolidated_charge(
     return best_charge, best_carrier
 
 
-def _get_week_key(ship_date: date) -> Tuple[int, int]:
-    """Get (year, week_number) for a date."""
-    iso_cal = ship_date.isocalendar()
-    return (iso_cal[0], iso_cal[1])
+def _to_cents(value: Optional[Decimal]) -> int:
+    return int(value.scaleb(2).to_integral_value()) if value is not None else 0
+
 
+def _from_cents(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
 
-def _is_mon_thu(ship_date: date) -> bool:
-    """Check if date is Monday through Thursday (weekday 0-3)."""
-    return ship_date.weekday() <= 3  # Mon=0, Tue=1, Wed=2, Thu=3
+
+def _iso_week_parts(ship_dates: List[Optional[date]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized (weekday, ISO year, ISO week) per date; Monday is weekday 0.
+    Missing dates produce garbage values and must be masked by the caller.
+    """
+    days = np.array(ship_dates, dtype="datetime64[D]")
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekdays = (days.astype(np.int64) + 3) % 7
+    # An ISO week belongs to the year containing its Thursday
+    thursdays = days - weekdays + 3
+    iso_years = thursdays.astype("datetime64[Y]")
+    iso_weeks = (thursdays - iso_years.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+    return weekdays, iso_years.astype(np.int64) + 1970, iso_weeks
 
 
 def _compute_consolidation_opportunities(
@@ -336,7 +356,15 @@ def _compute_consolidation_opportunities(
     
     The weekly mode matches what the TransX analyst did in their Excel model.
     """
-    by_key: Dict[Tuple[str, str, str, any], List[int]] = defaultdict(list)
+    group_codes: Dict[Tuple[str, str, str, any], int] = {}
+    group_keys: List[Tuple[str, str, str, any]] = []
+    member_indices: List[int] = []
+    member_groups: List[int] = []
+
+    if use_weekly_consolidation:
+        weekdays, iso_years, iso_weeks = _iso_week_parts([rec.ship_date for rec in records])
+        # Pack (ISO year, week) into one int so group keys stay flat
+        week_keys = (iso_years * 100 + iso_weeks).tolist()
 
     for idx, rec in enumerate(records):
         if not rec.ship_date or not rec.dest_province_key:
@@ -344,56 +372,72 @@ def _compute_consolidation_opportunities(
         
         if use_weekly_consolidation:
             # Mon-Thu consolidation: group by week, only include Mon-Thu shipments
-            if not _is_mon_thu(rec.ship_date):
+            if weekdays[idx] > 3:
                 continue  # Skip Fri-Sun shipments for weekly consolidation
-            week_key = _get_week_key(rec.ship_date)
-            key = (rec.origin_key, rec.dest_city_key, rec.dest_province_key, week_key)
+            key = (rec.origin_key, rec.dest_city_key, rec.dest_province_key, week_keys[idx])
         else:
             # Same-day consolidation (original behavior)
             key = (rec.origin_key, rec.dest_city_key, rec.dest_province_key, rec.ship_date)
         
-        by_key[key].append(idx)
+        code = group_codes.get(key)
+        if code is None:
+            code = group_codes[key] = len(group_keys)
+            group_keys.append(key)
+        member_indices.append(idx)
+        member_groups.append(code)
 
     entries_by_origin: Dict[str, List[TariffCacheEntry]] = defaultdict(list)
     for entry in entries:
-        entries_by_origin[_normalize(entry.origin_dc)].append(entry)
+        entries_by_origin[entry.origin_norm].append(entry)
 
-    consolidation_savings_total = Decimal("0")
+    consolidation_savings_total = _ZERO
     opportunities: List[ConsolidationOpportunity] = []
     group_count = 0
 
-    for key, indices in by_key.items():
-        if len(indices) < 2:
-            continue
-        origin_key, dest_city_key, dest_province_key, ship_date = key
-        actual_sum = Decimal("0")
-        individual_best_sum = Decimal("0")
-        pallets_total = Decimal("0")
-        weight_total = Decimal("0")
-        dim_total = Decimal("0")
-        valid_records = 0
-
-        for idx in indices:
-            rec = records[idx]
-            update = updates[idx]
-            actual_sum += rec.actual_charge or Decimal("0")
-            if update.best_charge is not None:
-                individual_best_sum += update.best_charge
-            else:
-                individual_best_sum += rec.actual_charge or Decimal("0")
-            pallets_total += rec.pallets or Decimal("0")
-            weight_total += rec.weight or Decimal("0")
-            dim_total += rec.dim_weight or Decimal("0")
-            valid_records += 1
-
-        if valid_records < 2:
+    if not group_keys:
+        return consolidation_savings_total, opportunities, group_count
+
+    # Sum each group's money/weight columns in exact int64 cents. Members are
+    # sorted by group (stably, so each group keeps record order) and reduced
+    # with one np.add.reduceat per column.
+    sorted_groups = np.array(member_groups)
+    order = np.argsort(sorted_groups, kind="stable")
+    members = np.array(member_indices)[order]
+    group_starts = np.flatnonzero(np.diff(sorted_groups[order], prepend=-1))
+    group_sizes = np.diff(np.append(group_starts, len(members)))
+
+    def group_sums(values: List[int]) -> np.ndarray:
+        return np.add.reduceat(np.array(values, dtype=np.int64), group_starts)
+
+    member_records = [records[idx] for idx in members]
+    actual_cents = [_to_cents(rec.actual_charge) for rec in member_records]
+    actual_sums = group_sums(actual_cents)
+    best_sums = group_sums(
+        [
+            _to_cents(updates[idx].best_charge) if updates[idx].best_charge is not None else actual
+            for idx, actual in zip(members, actual_cents)
+        ]
+    )
+    pallets_sums = group_sums([_to_cents(rec.pallets) for rec in member_records])
+    weight_sums = group_sums([_to_cents(rec.weight) for rec in member_records])
+    dim_sums = group_sums([_to_cents(rec.dim_weight) for rec in member_records])
+
+    for code, key in enumerate(group_keys):
+        if group_sizes[code] < 2:
             continue
+        origin_key, city_key, province_key = key[:3]
+        indices = members[group_starts[code] : group_starts[code] + group_sizes[code]]
+        actual_sum = _from_cents(actual_sums[code])
+        individual_best_sum = _from_cents(best_sums[code])
+        pallets_total = _from_cents(pallets_sums[code])
+        weight_total = _from_cents(weight_sums[code])
+        dim_total = _from_cents(dim_sums[code])
 
         billable = max(weight_total, dim_total) if any([weight_total, dim_total]) else None
         consolidated_charge, carrier = _best_consolidated_charge(
             origin_key,
-            records[indices[0]].dest_city,
-            records[indices[0]].dest_province,
+            city_key,
+            province_key,
             billable,
             pallets_total,
             weight_total,
@@ -412,14 +456,14 @@ def _compute_consolidation_opportunities(
         
         # For weekly consolidation, use the Thursday of that week as the "ship_date"
         # For same-day, use the actual ship_date
-        if use_weekly_consolidation and isinstance(key[3], tuple):
-            # key[3] is (year, week_number)
+        if use_weekly_consolidation:
+            # key[3] is year * 100 + week_number
             # Find the Thursday of that week
             first_rec_date = records[indices[0]].ship_date
             days_until_thursday = (3 - first_rec_date.weekday()) % 7
             consolidated_ship_date = first_rec_date + timedelta(days=days_until_thursday)
         else:
-            consolidated_ship_date = key[3] if isinstance(key[3], date) else records[indices[0]].ship_date
+            consolidated_ship_date = key[3]
         
         opportunities.append(
             ConsolidationOpportunity(
@@ -447,10 +491,10 @@ def run_vectorized_rerate(
     if not records:
         return VectorizedRerateResult(
             shipment_updates=[],
-            carrier_savings_total=Decimal("0"),
-            carrier_best_total=Decimal("0"),
+            carrier_savings_total=_ZERO,
+            carrier_best_total=_ZERO,
             rerated_count=0,
-            consolidation_savings_total=Decimal("0"),
+            consolidation_savings_total=_ZERO,
             consolidation_groups=[],
             consolidation_group_count=0,
         )
@@ -459,10 +503,9 @@ def run_vectorized_rerate(
     if not entries:
         raise ValueError("No tariffs available for re-rating")
 
-    df = _records_to_dataframe(records)
-    carrier_columns, column_to_carrier = _compute_carrier_columns(df, records, entries)
+    charges = _compute_carrier_charges(_records_to_arrays(records), entries)
     shipment_updates, carrier_savings_total, best_total, rerated_count = _build_shipment_updates(
-        df, records, carrier_columns, column_to_carrier
+        records, charges, [entry.carrier_name for entry in entries]
     )
     consolidation_total, consolidation_groups, consolidation_group_count = _compute_consolidation_opportunities(
         records, shipment_updates, entries
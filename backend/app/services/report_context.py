@@ -3,17 +3,19 @@ Builds structured JSON context for audits (used by AI + PPT generation).
 """
 from __future__ import annotations
 
+import heapq
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, func
+from sqlalchemy.orm import Session, joinedload
 
 from app.models import AuditRun, LaneStat, Shipment, AuditResult
-from app.services.audit_engine import get_exceptions
+from app.services.audit_engine import iter_exceptions
 
 REGION_MAP = {
     "BC": "West",
@@ -31,6 +33,15 @@ REGION_MAP = {
     "NU": "North",
 }
 
+# Exception counts (total, zero_charge, dim_heavy) per audit run, keyed by
+# (audit_run_id, audit_run.updated_at) so a re-run audit (which bumps
+# updated_at) is never served stale results
+_EXCEPTIONS_CACHE: Dict[
+    Tuple[UUID, Optional[datetime]], Tuple[datetime, Tuple[int, int, int]]
+] = {}
+_EXCEPTIONS_CACHE_LOCK = Lock()
+_EXCEPTIONS_CACHE_TTL = timedelta(seconds=60)
+
 
 def _decimal_to_float(value: Optional[Decimal]) -> Optional[float]:
     return float(value) if value is not None else None
@@ -40,15 +51,48 @@ def _format_currency(value: Decimal) -> float:
     return float(value.quantize(Decimal("0.01"))) if value is not None else 0.0
 
 
-def _infer_region(shipment: Shipment) -> str:
-    if shipment.dest_region:
-        return shipment.dest_region
-    province = (shipment.dest_province or "").upper().strip()
+def _infer_region(dest_region: Optional[str], dest_province: Optional[str]) -> str:
+    if dest_region:
+        return dest_region
+    province = (dest_province or "").upper().strip()
     return REGION_MAP.get(province, province or "Unknown")
 
 
-def _gather_shipments(db: Session, audit_run_id: UUID) -> List[Shipment]:
-    return db.query(Shipment).filter(Shipment.audit_run_id == audit_run_id).all()
+def _shipment_totals(db: Session, audit_run_id: UUID) -> Row:
+    return (
+        db.query(
+            func.count(Shipment.id),
+            func.sum(Shipment.actual_charge),
+            func.sum(Shipment.weight),
+            func.sum(Shipment.pallets),
+        )
+        .filter(Shipment.audit_run_id == audit_run_id)
+        .one()
+    )
+
+
+def _grouped_shipment_stats(db: Session, audit_run_id: UUID, *columns: Any) -> Sequence[Row]:
+    """(*columns, shipment count, spend, weight) per distinct value of `columns`."""
+    return (
+        db.query(
+            *columns,
+            func.count(Shipment.id),
+            func.sum(Shipment.actual_charge),
+            func.sum(Shipment.weight),
+        )
+        .filter(Shipment.audit_run_id == audit_run_id)
+        .group_by(*columns)
+        .order_by(*columns)
+        .all()
+    )
+
+
+def _add_group_stats(
+    stats: Dict[str, Decimal], count: int, spend: Optional[Decimal], weight: Optional[Decimal]
+) -> None:
+    stats["shipments"] += count
+    stats["spend"] += spend or Decimal("0")
+    stats["weight"] += weight or Decimal("0")
 
 
 def _gather_lane_stats(db: Session, audit_run_id: UUID) -> List[LaneStat]:
@@ -70,44 +114,72 @@ def _carrier_savings(db: Session, audit_run_id: UUID) -> Decimal:
     return value or Decimal("0")
 
 
+def _cached_exception_counts(db: Session, audit_run: AuditRun) -> Tuple[int, int, int]:
+    """
+    (total, zero_charge, dim_heavy) over the audit run's exceptions, counted while
+    they stream in and reused for a short TTL across report builds.
+    """
+    key = (audit_run.id, audit_run.updated_at)
+    now = datetime.utcnow()
+    with _EXCEPTIONS_CACHE_LOCK:
+        cached = _EXCEPTIONS_CACHE.get(key)
+        if cached is not None and now - cached[0] <= _EXCEPTIONS_CACHE_TTL:
+            return cached[1]
+
+    total = zero_charge = dim_heavy = 0
+    for exc in iter_exceptions(db, audit_run.id, "all"):
+        total += 1
+        flags = exc.get("flags") or ()
+        if "ZERO_CHARGE" in flags:
+            zero_charge += 1
+        if "DIM_HEAVY" in flags:
+            dim_heavy += 1
+    counts = (total, zero_charge, dim_heavy)
+    with _EXCEPTIONS_CACHE_LOCK:
+        expired = [
+            cache_key
+            for cache_key, (stored_at, _) in _EXCEPTIONS_CACHE.items()
+            if now - stored_at > _EXCEPTIONS_CACHE_TTL
+        ]
+        for cache_key in expired:
+            del _EXCEPTIONS_CACHE[cache_key]
+        _EXCEPTIONS_CACHE[key] = (now, counts)
+    return counts
+
+
 def build_report_context(db: Session, audit_run_id: UUID) -> Dict[str, Any]:
     audit_run = (
         db.query(AuditRun)
+        .options(joinedload(AuditRun.customer))
         .filter(AuditRun.id == audit_run_id)
         .first()
     )
     if not audit_run:
         raise ValueError(f"Audit run {audit_run_id} not found")
 
-    shipments = _gather_shipments(db, audit_run_id)
     lane_stats = _gather_lane_stats(db, audit_run_id)
 
-    total_shipments = len(shipments)
-    total_spend = Decimal("0")
-    total_weight = Decimal("0")
-    total_pallets = Decimal("0")
+    # Aggregate in the database; raw groups are merged below under the
+    # normalized DC / inferred region keys.
+    total_shipments, total_spend, total_weight, total_pallets = _shipment_totals(db, audit_run_id)
+    total_spend = total_spend or Decimal("0")
+    total_weight = total_weight or Decimal("0")
+    total_pallets = total_pallets or Decimal("0")
 
     dc_stats: Dict[str, Dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
     region_stats: Dict[str, Dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
 
-    for shipment in shipments:
-        actual = shipment.actual_charge or Decimal("0")
-        weight = shipment.weight or Decimal("0")
-        pallets = shipment.pallets or Decimal("0")
-
-        total_spend += actual
-        total_weight += weight
-        total_pallets += pallets
-
-        dc_key = (shipment.origin_dc or "UNKNOWN").upper()
-        dc_stats[dc_key]["shipments"] += 1
-        dc_stats[dc_key]["spend"] += actual
-        dc_stats[dc_key]["weight"] += weight
+    for origin_dc, count, spend, weight in _grouped_shipment_stats(
+        db, audit_run_id, Shipment.origin_dc
+    ):
+        _add_group_stats(dc_stats[(origin_dc or "UNKNOWN").upper()], count, spend, weight)
 
-        region_key = _infer_region(shipment)
-        region_stats[region_key]["shipments"] += 1
-        region_stats[region_key]["spend"] += actual
-        region_stats[region_key]["weight"] += weight
+    for dest_region, dest_province, count, spend, weight in _grouped_shipment_stats(
+        db, audit_run_id, Shipment.dest_region, Shipment.dest_province
+    ):
+        _add_group_stats(
+            region_stats[_infer_region(dest_region, dest_province)], count, spend, weight
+        )
 
     summary_metrics = audit_run.summary_metrics or {}
     carrier_savings = summary_metrics.get("carrier_savings_total")
@@ -145,17 +217,15 @@ def build_report_context(db: Session, audit_run_id: UUID) -> Dict[str, Any]:
             "savings": _decimal_to_float(lane.theoretical_savings),
             "savings_pct": _decimal_to_float(lane.savings_pct),
         }
-        for lane in sorted(
+        for lane in heapq.nlargest(
+            10,
             lane_stats,
             key=lambda ls: ls.theoretical_savings or Decimal("0"),
-            reverse=True,
-        )[:10]
+        )
         if lane.theoretical_savings
     ]
 
-    exceptions = get_exceptions(db, audit_run_id, "all")
-    zero_charge = sum(1 for exc in exceptions if "ZERO_CHARGE" in exc.get("flags", []))
-    dim_heavy = sum(1 for exc in exceptions if "DIM_HEAVY" in exc.get("flags", []))
+    exception_total, zero_charge, dim_heavy = _cached_exception_counts(db, audit_run)
 
     return {
         "audit": {
@@ -208,7 +278,7 @@ def build_report_context(db: Session, audit_run_id: UUID) -> Dict[str, Any]:
         "top_lanes_by_spend": lane_spend,
         "top_lanes_by_savings": top_savings,
         "exceptions": {
-            "total": len(exceptions),
+            "total": exception_total,
             "zero_charge": zero_charge,
             "dim_heavy": dim_heavy,
         },
@@ -3,17 +3,25 @@ Tariff cache utilities to keep tariff/lanes/breaks in memory for fast rating.
 """
 from __future__ import annotations
 
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from decimal import Decimal
 from threading import Lock
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from sqlalchemy.orm import Session, selectinload
 
 from app.models.tariff import Tariff, TariffLane, TariffBreak, TariffType
 
 
+# Rates and charges are kept as integers of 1/10000 dollar (rate_per_cwt has
+# four decimal places), so rating stays exact without Decimal.
+MONEY_UNITS_PER_DOLLAR = 10000
+_ZERO = Decimal("0")
+
+
 def _to_decimal(value) -> Optional[Decimal]:
     if value is None:
         return None
@@ -22,83 +30,144 @@ def _to_decimal(value) -> Optional[Decimal]:
     return Decimal(str(value))
 
 
-@dataclass
+def _to_money_units(value: Decimal) -> int:
+    return int((value * MONEY_UNITS_PER_DOLLAR).to_integral_value())
+
+
+def lane_key(city_key: str, prov_key: str) -> str:
+    """Flat lookup key for a normalized (city, province) pair."""
+    return f"{city_key}|{prov_key}"
+
+
+@dataclass(slots=True)
 class CwtBreak:
-    start: Optional[Decimal]
-    end: Optional[Decimal]
-    rate_per_cwt: Decimal
+    start_f: float  # a missing start is stored as 0
+    end_f: Optional[float]
+    rate_units: int
 
 
-@dataclass
+@dataclass(slots=True)
 class SkidBreak:
     num_spots: int
-    charge: Decimal
+    charge_units: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TariffLaneCache:
-    min_charge: Decimal
+    min_charge_units: int
     cwt_breaks: List[CwtBreak] = field(default_factory=list)
-    skid_breaks: Dict[int, Decimal] = field(default_factory=dict)
+    skid_breaks_units: Dict[int, int] = field(default_factory=dict)
+    # Parallel break columns for searchsorted rating, built by index_cwt_breaks()
+    cwt_starts: np.ndarray = field(default_factory=lambda: np.empty(0))
+    cwt_ends: np.ndarray = field(default_factory=lambda: np.empty(0))
+    cwt_rate_units: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    cwt_breaks_disjoint: bool = True
+    # Lane-specialized scalar CWT rater, built on first use by the rating engine
+    cwt_rater: Optional[Callable[[float], Optional[int]]] = None
+
+    def index_cwt_breaks(self) -> None:
+        """Sort CWT breaks by start weight and build the parallel break arrays."""
+        self.cwt_breaks.sort(key=lambda b: b.start_f)
+        self.cwt_starts = np.array([br.start_f for br in self.cwt_breaks], dtype=np.float64)
+        self.cwt_ends = np.array(
+            [np.inf if br.end_f is None else br.end_f for br in self.cwt_breaks],
+            dtype=np.float64,
+        )
+        self.cwt_rate_units = np.array([br.rate_units for br in self.cwt_breaks], dtype=np.int64)
+        # When ranges don't overlap, the break containing a weight is always the
+        # last one starting at or below it, which a binary search finds directly.
+        self.cwt_breaks_disjoint = bool(np.all(self.cwt_ends[:-1] <= self.cwt_starts[1:]))
 
 
-@dataclass
+@dataclass(slots=True)
 class TariffCacheEntry:
     id: str
     carrier_name: str
     origin_dc: str
     tariff_type: TariffType
-    lanes_by_city: Dict[Tuple[str, str], TariffLaneCache] = field(default_factory=dict)
+    # Keyed by lane_key(city, province)
+    lanes_by_city: Dict[str, TariffLaneCache] = field(default_factory=dict)
     lanes_by_province: Dict[str, TariffLaneCache] = field(default_factory=dict)
+    origin_norm: str = field(init=False)
 
-    def _normalize_key(self, city: Optional[str], province: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
-        city_key = city.upper().strip() if city else None
-        prov_key = province.upper().strip() if province else None
-        return city_key, prov_key
+    def __post_init__(self) -> None:
+        self.origin_norm = (self.origin_dc or "").strip().upper()
 
     def find_lane(self, dest_city: Optional[str], dest_province: Optional[str]) -> Optional[TariffLaneCache]:
-        if not dest_province:
+        return self.find_lane_normalized(
+            dest_city.upper().strip() if dest_city else "",
+            dest_province.upper().strip() if dest_province else "",
+        )
+
+    def find_lane_normalized(self, city_key: str, prov_key: str) -> Optional[TariffLaneCache]:
+        """find_lane for keys already upper-cased and stripped ("" when missing)."""
+        if not prov_key:
             return None
-        city_key, prov_key = self._normalize_key(dest_city, dest_province)
-        if city_key and prov_key:
-            lane = self.lanes_by_city.get((city_key, prov_key))
+        if city_key:
+            lane = self.lanes_by_city.get(lane_key(city_key, prov_key))
             if lane:
                 return lane
-        if prov_key:
-            return self.lanes_by_province.get(prov_key)
-        return None
+        return self.lanes_by_province.get(prov_key)
 
 
 @dataclass
 class TariffCache:
     entries: List[TariffCacheEntry]
     last_loaded: datetime
+    entries_by_origin: Dict[str, List[TariffCacheEntry]] = field(init=False)
+    entries_by_id: Dict[str, TariffCacheEntry] = field(init=False)
+    # Keyed by (upper-cased carrier name, normalized origin DC)
+    by_carrier_dc: Dict[Tuple[str, str], TariffCacheEntry] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.entries_by_origin = defaultdict(list)
+        self.entries_by_id = {}
+        self.by_carrier_dc = {}
+        for entry in self.entries:
+            self.entries_by_id[entry.id] = entry
+            self.entries_by_origin[entry.origin_norm].append(entry)
+            self.by_carrier_dc.setdefault(
+                ((entry.carrier_name or "").strip().upper(), entry.origin_norm), entry
+            )
+
+    def find(self, carrier_name: Optional[str], origin_dc: Optional[str]) -> Optional[TariffCacheEntry]:
+        """Tariff for a carrier out of an origin DC, matched case-insensitively."""
+        return self.by_carrier_dc.get(
+            ((carrier_name or "").strip().upper(), (origin_dc or "").strip().upper())
+        )
 
 
 _TARIFF_CACHE: Optional[TariffCache] = None
 _CACHE_LOCK = Lock()
+# Held for the whole rebuild so only one caller queries the database at a time
+_RELOAD_LOCK = Lock()
 _CACHE_TTL = timedelta(minutes=10)
 
 
 def _build_lane_cache(lane: TariffLane) -> TariffLaneCache:
-    min_charge = _to_decimal(lane.min_charge) or Decimal("0")
-    cache = TariffLaneCache(min_charge=min_charge)
+    # Decimal column values are converted here once; the cache itself holds only
+    # floats (weights) and integer money units (charges)
+    min_charge = _to_decimal(lane.min_charge) or _ZERO
+    cache = TariffLaneCache(min_charge_units=_to_money_units(min_charge))
 
     for br in lane.breaks:
         rate = _to_decimal(br.rate_per_cwt)
         if br.num_spots and br.spot_charge is not None:
-            cache.skid_breaks[int(br.num_spots)] = _to_decimal(br.spot_charge) or Decimal("0")
+            spot_charge = _to_decimal(br.spot_charge) or _ZERO
+            cache.skid_breaks_units[int(br.num_spots)] = _to_money_units(spot_charge)
         elif rate is not None:
+            start = _to_decimal(br.break_from_weight)
+            end = _to_decimal(br.break_to_weight)
             cache.cwt_breaks.append(
                 CwtBreak(
-                    start=_to_decimal(br.break_from_weight),
-                    end=_to_decimal(br.break_to_weight),
-                    rate_per_cwt=rate,
+                    start_f=float(start) if start is not None else 0.0,
+                    end_f=float(end) if end is not None else None,
+                    rate_units=_to_money_units(rate),
                 )
             )
 
     # Ensure CWT breaks sorted by start weight
-    cache.cwt_breaks.sort(key=lambda b: b.start or Decimal("0"))
+    cache.index_cwt_breaks()
     return cache
 
 
@@ -122,7 +191,7 @@ def _load_tariff_cache(db: Session) -> TariffCache:
             prov_key = lane.dest_province.upper().strip()
             if lane.dest_city:
                 city_key = lane.dest_city.upper().strip()
-                entry.lanes_by_city[(city_key, prov_key)] = lane_cache
+                entry.lanes_by_city[lane_key(city_key, prov_key)] = lane_cache
             else:
                 entry.lanes_by_province[prov_key] = lane_cache
         entries.append(entry)
@@ -131,14 +200,31 @@ def _load_tariff_cache(db: Session) -> TariffCache:
 
 
 def get_tariff_cache(db: Session, force_reload: bool = False) -> TariffCache:
+    """
+    Current tariff snapshot. Reloads build a new snapshot outside _CACHE_LOCK and
+    swap it in; while an expired cache is rebuilding, other callers keep getting
+    the previous snapshot instead of waiting on the database.
+    """
     global _TARIFF_CACHE
     with _CACHE_LOCK:
-        should_reload = force_reload or _TARIFF_CACHE is None
-        if _TARIFF_CACHE and not should_reload:
-            if datetime.utcnow() - _TARIFF_CACHE.last_loaded > _CACHE_TTL:
-                should_reload = True
-        if should_reload:
-            _TARIFF_CACHE = _load_tariff_cache(db)
-        return _TARIFF_CACHE
-
-
+        current = _TARIFF_CACHE
+    if current is not None and not force_reload:
+        if datetime.utcnow() - current.last_loaded <= _CACHE_TTL:
+            return current
+        if not _RELOAD_LOCK.acquire(blocking=False):
+            return current
+    else:
+        _RELOAD_LOCK.acquire()
+
+    try:
+        if not force_reload:
+            with _CACHE_LOCK:
+                if _TARIFF_CACHE is not current:
+                    # Another caller finished a rebuild while this one waited
+                    return _TARIFF_CACHE
+        fresh = _load_tariff_cache(db)
+        with _CACHE_LOCK:
+            _TARIFF_CACHE = fresh
+        return fresh
+    finally:
+        _RELOAD_LOCK.release()
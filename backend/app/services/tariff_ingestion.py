@@ -1,20 +1,41 @@
 """
 Tariff ingestion service - parses XLSX rate sheets into database.
 """
+import io
 import os
 import re
-from decimal import Decimal
+import uuid
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
 
+from app.db.bulk_copy import copy_rows, copy_supported
 from app.models import Tariff, TariffLane, TariffBreak
 from app.models.tariff import TariffType
 from app.config.mapping_loader import get_tariff_mapping_for_file
 
 
+# Scales of the Numeric columns sheet values are stored in
+_RATE_QUANTUM = Decimal("0.0001")  # TariffBreak.rate_per_cwt
+_MONEY_QUANTUM = Decimal("0.01")  # TariffLane.min_charge, TariffBreak.spot_charge
+
+
+def _cell_decimal(value: Any, quantum: Decimal) -> Decimal:
+    """
+    Decimal for a numeric sheet cell, rounded half away from zero to the
+    column scale as PostgreSQL's Numeric would round the cell's text.
+    """
+    # The shortest round-trip repr is the value as typed (0.615, not the
+    # binary 0.61499...), so half-way cells round up like Decimal(str(v)).
+    return Decimal(repr(float(value))).quantize(quantum, rounding=ROUND_HALF_UP)
+
+
 def _clear_tariff_lanes_and_breaks(db: Session, tariff_id: Any) -> None:
     """
     Safely clear a tariff before re-ingest.
@@ -22,26 +43,66 @@ def _clear_tariff_lanes_and_breaks(db: Session, tariff_id: Any) -> None:
     Bulk deletes bypass SQLAlchemy ORM cascades, so we must delete child breaks
     before deleting parent lanes to avoid FK violations.
     """
-    lane_ids = [
-        row[0]
-        for row in db.query(TariffLane.id).filter(TariffLane.tariff_id == tariff_id).all()
-    ]
-    if lane_ids:
-        db.query(TariffBreak).filter(TariffBreak.tariff_lane_id.in_(lane_ids)).delete(
-            synchronize_session=False
-        )
+    lane_ids = db.query(TariffLane.id).filter(TariffLane.tariff_id == tariff_id)
+    db.query(TariffBreak).filter(TariffBreak.tariff_lane_id.in_(lane_ids.scalar_subquery())).delete(
+        synchronize_session=False
+    )
     db.query(TariffLane).filter(TariffLane.tariff_id == tariff_id).delete(
         synchronize_session=False
     )
     db.flush()
 
 
+def _insert_lanes_and_breaks(
+    db: Session,
+    lane_rows: List[Dict[str, Any]],
+    breaks_by_lane: Dict[Any, List[Dict[str, Any]]],
+) -> None:
+    """Insert lanes and their breaks as plain rows without ORM objects."""
+    db.flush()
+    break_rows = [row for lane_breaks in breaks_by_lane.values() for row in lane_breaks]
+    if copy_supported(db):
+        for model, rows in ((TariffLane, lane_rows), (TariffBreak, break_rows)):
+            if rows:
+                copy_rows(db, model, rows)
+        return
+    # Core executemany: one compiled INSERT per table, no ORM mapper work per row
+    if lane_rows:
+        db.execute(TariffLane.__table__.insert(), lane_rows)
+    if break_rows:
+        db.execute(TariffBreak.__table__.insert(), break_rows)
+
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+# Same deletion as _NON_ALNUM_RE for ASCII text, as a single str.translate pass
+_DROP_ASCII_NON_ALNUM = str.maketrans(
+    "", "", "".join(c for c in map(chr, range(128)) if not ("A" <= c <= "Z" or "0" <= c <= "9"))
+)
+
+
 def _normalize_column_key(value: Any) -> str:
     """Normalize column labels for resilient matching across file variants."""
     if value is None:
         return ""
-    text = str(value).strip().upper()
-    return re.sub(r"[^A-Z0-9]+", "", text)
+    return _normalize_label(str(value))
+
+
+@lru_cache(maxsize=2048)
+def _normalize_label(text: str) -> str:
+    # Sheets repeat the same handful of labels across header scans and lookups
+    text = text.strip().upper()
+    if text.isascii():
+        return text.translate(_DROP_ASCII_NON_ALNUM)
+    return _NON_ALNUM_RE.sub("", text)
+
+
+def _excel_engine() -> Optional[str]:
+    """Prefer the calamine reader when python-calamine is installed."""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    return "calamine"
 
 
 def _read_excel_resilient(
@@ -60,13 +121,27 @@ def _read_excel_resilient(
     expected_tokens = {_normalize_column_key(h) for h in (expected_headers or []) if _normalize_column_key(h)}
 
     requested_sheet: Any = sheet_name if sheet_name not in (None, "") else 0
+    engine = _excel_engine()
 
-    def _read_df(*, header: Any, nrows: Optional[int] = None) -> pd.DataFrame:
+    # Read the workbook from disk once; the header preview and the final frame
+    # are both parsed from this buffer.
+    with open(file_path, "rb") as handle:
+        workbook = handle.read()
+
+    def _read_df(*, header: Any, **kwargs: Any) -> pd.DataFrame:
         try:
-            obj = pd.read_excel(file_path, sheet_name=requested_sheet, header=header, nrows=nrows)
+            obj = pd.read_excel(
+                io.BytesIO(workbook),
+                sheet_name=requested_sheet,
+                header=header,
+                engine=engine,
+                **kwargs,
+            )
         except Exception:
             # Fallback to first sheet if configured sheet is missing/misspelled.
-            obj = pd.read_excel(file_path, sheet_name=0, header=header, nrows=nrows)
+            obj = pd.read_excel(
+                io.BytesIO(workbook), sheet_name=0, header=header, engine=engine, **kwargs
+            )
 
         # pandas returns a dict when sheet_name=None; coerce to first DataFrame.
         if isinstance(obj, dict):
@@ -83,13 +158,13 @@ def _read_excel_resilient(
         best_score = -1
         preview = _read_df(header=None, nrows=12)
 
-        for idx in range(len(preview.index)):
-            row_values = preview.iloc[idx].tolist()
-            row_tokens = {_normalize_column_key(v) for v in row_values if pd.notna(v)}
-            score = len(expected_tokens.intersection(row_tokens))
-            if score > best_score:
-                best_score = score
-                candidate_header = idx
+        # Score every preview row at once: distinct expected tokens per row
+        # (stack drops empty cells and keeps the row position as level 0).
+        tokens = preview.stack().map(_normalize_column_key)
+        scores = tokens[tokens.isin(list(expected_tokens))].groupby(level=0).nunique()
+        if not scores.empty:
+            best_score = int(scores.max())
+            candidate_header = int(scores.idxmax())
 
         # Avoid accidental promotion when there is weak/no signal.
         if best_score < 2:
@@ -102,18 +177,27 @@ def _read_excel_resilient(
     return df
 
 
-def _resolve_column_name(
-    df: pd.DataFrame,
-    primary: Optional[Any],
-    fallbacks: Optional[List[Any]] = None,
-) -> Optional[Any]:
-    """Resolve a desired column name to an actual DataFrame column label."""
+def _column_keys(df: pd.DataFrame) -> List[str]:
+    """_normalize_column_key for every column label, in one vectorized string pass."""
+    keys = pd.Index(df.columns).astype(str).str.strip().str.upper()
+    return keys.str.replace(_NON_ALNUM_RE.pattern, "", regex=True).tolist()
+
+
+def _columns_by_key(df: pd.DataFrame) -> Dict[str, Any]:
+    """Normalized label -> actual column label (first column wins on collisions)."""
     normalized_to_actual: Dict[str, Any] = {}
-    for col in df.columns:
-        norm = _normalize_column_key(col)
+    for norm, col in zip(_column_keys(df), df.columns):
         if norm and norm not in normalized_to_actual:
             normalized_to_actual[norm] = col
+    return normalized_to_actual
 
+
+def _resolve_column_name(
+    normalized_to_actual: Dict[str, Any],
+    primary: Optional[Any],
+    fallbacks: Optional[List[Any]] = None,
+) -> Optional[Any]:
+    """Resolve a desired column name to an actual column label via _columns_by_key."""
     candidates: List[Any] = []
     if primary is not None:
         candidates.append(primary)
@@ -127,7 +211,7 @@ def _resolve_column_name(
 
 
 def _resolve_break_columns(
-    df: pd.DataFrame,
+    normalized_to_actual: Dict[str, Any],
     break_columns: Optional[List[Any]],
 ) -> List[Any]:
     """Resolve configured break columns against actual sheet column labels."""
@@ -138,14 +222,14 @@ def _resolve_break_columns(
     for break_def in break_columns:
         if isinstance(break_def, dict):
             raw_col = break_def.get("column")
-            actual_col = _resolve_column_name(df, raw_col)
+            actual_col = _resolve_column_name(normalized_to_actual, raw_col)
             if actual_col is None:
                 continue
             normalized_def = dict(break_def)
             normalized_def["column"] = actual_col
             resolved.append(normalized_def)
         else:
-            actual_col = _resolve_column_name(df, break_def)
+            actual_col = _resolve_column_name(normalized_to_actual, break_def)
             if actual_col is not None:
                 resolved.append(actual_col)
     return resolved
@@ -159,8 +243,7 @@ def _infer_cwt_break_columns(
     """Infer likely CWT break columns when templates vary or config is stale."""
     excluded_norm = {_normalize_column_key(c) for c in (excluded_columns or []) if c is not None}
     inferred: List[Any] = []
-    for col in df.columns:
-        norm = _normalize_column_key(col)
+    for norm, col in zip(_column_keys(df), df.columns):
         if not norm or norm in excluded_norm:
             continue
         if norm in {"LTL", "L5CWT"}:
@@ -174,6 +257,92 @@ def _infer_cwt_break_columns(
     return inferred
 
 
+# Parse breaks using TransX analyst's weight break mapping:
+# LTL/L5CWT = 0-499 lb
+# 500/5CWT = 500-999 lb  
+# 1000/10CWT = 1000-1999 lb
+# 2000/20CWT = 2000-4999 lb
+# 5000/50CWT = 5000-9999 lb
+# 10000/100CWT+ = 10000+ lb
+
+# Standard break ranges (from_weight, to_weight) based on column label
+STANDARD_BREAK_RANGES = {
+    "LTL": (0, 500),
+    "L5CWT": (0, 500),
+    "500": (500, 1000),
+    "5CWT": (500, 1000),
+    "1000": (1000, 2000),
+    "10CWT": (1000, 2000),
+    "2000": (2000, 5000),
+    "20CWT": (2000, 5000),
+    "3000": (3000, 5000),  # Some tariffs have 3000 break
+    "30CWT": (3000, 5000),
+    "5000": (5000, 10000),
+    "50CWT": (5000, 10000),
+    "10000": (10000, None),  # Open-ended
+    "100CWT": (10000, 20000),
+    "200CWT": (20000, 30000),
+    "300CWT": (30000, 50000),
+    "500CWT": (50000, 100000),
+    "1000CWT": (100000, None),  # Open-ended
+}
+
+# Ranges inferred for other numeric column labels: the range containing the label
+NUMERIC_BREAK_RANGES = (
+    (0, 500),
+    (500, 1000),
+    (1000, 2000),
+    (2000, 5000),
+    (5000, 10000),
+    (10000, None),  # Open-ended
+)
+_NUMERIC_BREAK_BOUNDS = tuple(start for start, _ in NUMERIC_BREAK_RANGES[1:])
+
+
+def _cwt_break_range(break_def: Any) -> Optional[Tuple[Any, Decimal, Optional[Decimal]]]:
+    """Resolve a break column definition to (column, from_weight, to_weight), or None to skip it."""
+    if isinstance(break_def, dict):
+        break_col = break_def.get("column")
+        from_weight = break_def.get("from")
+        to_weight = break_def.get("to")
+    else:
+        break_col = break_def
+        from_weight = None
+        to_weight = None
+    
+    col_str = str(break_col).upper().strip()
+    
+    # If not explicitly defined, look up standard ranges
+    if from_weight is None or to_weight is None:
+        if col_str in STANDARD_BREAK_RANGES:
+            std_from, std_to = STANDARD_BREAK_RANGES[col_str]
+            from_weight = from_weight if from_weight is not None else std_from
+            to_weight = to_weight if to_weight is not None else std_to
+        else:
+            # Try to parse numeric column names
+            if col_str.isdigit():
+                # Infer range based on common patterns
+                from_weight, to_weight = NUMERIC_BREAK_RANGES[
+                    bisect_right(_NUMERIC_BREAK_BOUNDS, int(col_str))
+                ]
+            else:
+                return None  # Can't parse, skip
+    
+    from_decimal = Decimal(str(from_weight)) if from_weight is not None else Decimal("0")
+    to_decimal = Decimal(str(to_weight)) if to_weight is not None else None
+    return break_col, from_decimal, to_decimal
+
+
+def _numeric_values(df: pd.DataFrame, column: Any) -> np.ndarray:
+    """Column as float64, with blank and non-numeric cells as NaN."""
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _upper_text_values(df: pd.DataFrame, column: Any) -> np.ndarray:
+    """Per-row str(value).strip().upper() for a column, done column-wise."""
+    return df[column].astype(str).str.strip().str.upper().to_numpy()
+
+
 def parse_apps_tariff(file_path: str, db: Session) -> Tariff:
     """
     Parse APPS FAK Skid Rates 2025.xlsx
@@ -214,61 +383,65 @@ def parse_apps_tariff(file_path: str, db: Session) -> Tariff:
     
     # Find numeric columns (spot counts)
     requested_spots = config.get("spot_columns")
-    resolved_spots = _resolve_break_columns(df, requested_spots) if requested_spots else []
-    spot_columns = resolved_spots or [col for col in df.columns if _normalize_column_key(col).isdigit()]
+    columns = _columns_by_key(df)
+    resolved_spots = _resolve_break_columns(columns, requested_spots) if requested_spots else []
+    spot_columns = resolved_spots or [
+        col for norm, col in zip(_column_keys(df), df.columns) if norm.isdigit()
+    ]
     city_col = _resolve_column_name(
-        df,
+        columns,
         config.get("dest_city_column", "DESTINATION"),
         ["DESTINATION", "CITY", "DESTINATION CITY"],
     )
     province_col = _resolve_column_name(
-        df,
+        columns,
         config.get("dest_province_column", "PROV"),
         ["PROV", "PROVINCE"],
     )
     if city_col is None or province_col is None:
         raise ValueError("Could not resolve required APPS destination columns in uploaded file")
     
-    for _, row in df.iterrows():
-        # Normalize city/province to uppercase for consistent matching
-        dest_city = str(row.get(city_col, "")).strip().upper()
-        dest_province = str(row.get(province_col, "")).strip().upper()
+    # The tariff has no lanes at this point, so lanes are tracked in memory
+    # and bulk-inserted with their breaks once the sheet is read.
+    lanes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    breaks_by_lane: Dict[Any, List[Dict[str, Any]]] = {}
+    spot_values = [(int(spot_col), _numeric_values(df, spot_col)) for spot_col in spot_columns]
+    # Normalize city/province to uppercase for consistent matching
+    cities = _upper_text_values(df, city_col)
+    provinces = _upper_text_values(df, province_col)
+    for i in range(len(df)):
+        dest_city = cities[i]
+        dest_province = provinces[i]
         
         if not dest_city or not dest_province:
             continue
         
         # Get or create lane
-        lane = db.query(TariffLane).filter(
-            TariffLane.tariff_id == tariff.id,
-            TariffLane.dest_city == dest_city,
-            TariffLane.dest_province == dest_province
-        ).first()
-        
+        lane = lanes.get((dest_city, dest_province))
         if not lane:
-            lane = TariffLane(
-                tariff_id=tariff.id,
-                dest_city=dest_city,
-                dest_province=dest_province
-            )
-            db.add(lane)
-            db.flush()
+            lane = lanes[(dest_city, dest_province)] = {
+                "id": uuid.uuid4(),
+                "tariff_id": tariff.id,
+                "dest_city": dest_city,
+                "dest_province": dest_province,
+            }
+        lane_id = lane["id"]
         
-        # Delete existing breaks for this lane
-        db.query(TariffBreak).filter(TariffBreak.tariff_lane_id == lane.id).delete()
+        # A repeated destination row replaces the breaks of the earlier one
+        lane_breaks = breaks_by_lane[lane_id] = []
         
         # Create breaks for each spot count
-        for spot_col in spot_columns:
-            num_spots = int(spot_col)
-            spot_charge = row.get(spot_col)
+        for num_spots, charges in spot_values:
+            spot_charge = charges[i]
             
-            if pd.notna(spot_charge) and spot_charge:
-                break_row = TariffBreak(
-                    tariff_lane_id=lane.id,
-                    num_spots=num_spots,
-                    spot_charge=Decimal(str(spot_charge))
-                )
-                db.add(break_row)
+            if spot_charge and np.isfinite(spot_charge):
+                lane_breaks.append({
+                    "tariff_lane_id": lane_id,
+                    "num_spots": num_spots,
+                    "spot_charge": _cell_decimal(spot_charge, _MONEY_QUANTUM),
+                })
     
+    _insert_lanes_and_breaks(db, list(lanes.values()), breaks_by_lane)
     db.commit()
     return tariff
 
@@ -355,18 +528,19 @@ def parse_cwt_tariff(
                     inferred_breaks.append(col)
         break_columns = inferred_breaks
 
+    columns = _columns_by_key(df)
     city_col = _resolve_column_name(
-        df,
+        columns,
         dest_city_column or "DESTINATION",
         ["CITY", "DESTINATION", "DESTINATION CITY", "LOCATION"],
     )
     province_col = _resolve_column_name(
-        df,
+        columns,
         dest_province_column,
         ["PROV", "PROVINCE", "STATE"],
     )
     min_charge_col = _resolve_column_name(
-        df,
+        columns,
         min_col,
         ["MIN", "MINIMUM", "MIN CHARGE", "MINCHARGE", "LTL MIN", "LTLMIN"],
     )
@@ -374,132 +548,69 @@ def parse_cwt_tariff(
     if province_col is None:
         raise ValueError("Could not resolve province column for CWT tariff sheet")
 
-    resolved_break_columns = _resolve_break_columns(df, break_columns)
+    resolved_break_columns = _resolve_break_columns(columns, break_columns)
     if not resolved_break_columns:
         resolved_break_columns = _infer_cwt_break_columns(
             df,
             excluded_columns=[city_col, province_col, min_charge_col],
         )
 
-    # Determine city column name
-    for _, row in df.iterrows():
-        # Normalize city/province to uppercase for consistent matching
-        dest_city = str(row.get(city_col, "")).strip().upper() if city_col else ""
-        dest_province = str(row.get(province_col, "")).strip().upper()
+    # The tariff has no lanes at this point, so lanes are tracked in memory
+    # and bulk-inserted with their breaks once the sheet is read.
+    lanes: Dict[Tuple[Optional[str], str], Dict[str, Any]] = {}
+    breaks_by_lane: Dict[Any, List[Dict[str, Any]]] = {}
+    # Break ranges depend only on the column, so resolve them once per sheet
+    break_specs = []
+    for break_def in resolved_break_columns:
+        break_range = _cwt_break_range(break_def)
+        if break_range is not None:
+            break_col, from_decimal, to_decimal = break_range
+            break_specs.append((_numeric_values(df, break_col), from_decimal, to_decimal))
+
+    # Normalize city/province to uppercase for consistent matching
+    cities = _upper_text_values(df, city_col) if city_col else None
+    provinces = _upper_text_values(df, province_col)
+    min_charges = _numeric_values(df, min_charge_col) if min_charge_col else None
+    for i in range(len(df)):
+        dest_city = cities[i] if cities is not None else ""
+        dest_province = provinces[i]
         
         if not dest_province:
             continue
         
-        min_charge = row.get(min_charge_col) if min_charge_col else None
-        if pd.isna(min_charge):
+        min_charge = min_charges[i] if min_charges is not None else None
+        if min_charge and np.isfinite(min_charge):
+            min_charge = _cell_decimal(min_charge, _MONEY_QUANTUM)
+        else:
             min_charge = None
         
         # Get or create lane
-        lane = db.query(TariffLane).filter(
-            TariffLane.tariff_id == tariff.id,
-            TariffLane.dest_city == dest_city,
-            TariffLane.dest_province == dest_province
-        ).first()
-        
+        lane_key = (dest_city or None, dest_province)
+        lane = lanes.get(lane_key)
         if not lane:
-            lane = TariffLane(
-                tariff_id=tariff.id,
-                dest_city=dest_city if dest_city else None,
-                dest_province=dest_province,
-                min_charge=Decimal(str(min_charge)) if min_charge else None
-            )
-            db.add(lane)
-            db.flush()
-        else:
-            lane.min_charge = Decimal(str(min_charge)) if min_charge else None
-        
-        # Delete existing breaks
-        db.query(TariffBreak).filter(TariffBreak.tariff_lane_id == lane.id).delete()
-        
-        # Parse breaks using TransX analyst's weight break mapping:
-        # LTL/L5CWT = 0-499 lb
-        # 500/5CWT = 500-999 lb  
-        # 1000/10CWT = 1000-1999 lb
-        # 2000/20CWT = 2000-4999 lb
-        # 5000/50CWT = 5000-9999 lb
-        # 10000/100CWT+ = 10000+ lb
-        
-        # Standard break ranges (from_weight, to_weight) based on column label
-        STANDARD_BREAK_RANGES = {
-            "LTL": (0, 500),
-            "L5CWT": (0, 500),
-            "500": (500, 1000),
-            "5CWT": (500, 1000),
-            "1000": (1000, 2000),
-            "10CWT": (1000, 2000),
-            "2000": (2000, 5000),
-            "20CWT": (2000, 5000),
-            "3000": (3000, 5000),  # Some tariffs have 3000 break
-            "30CWT": (3000, 5000),
-            "5000": (5000, 10000),
-            "50CWT": (5000, 10000),
-            "10000": (10000, None),  # Open-ended
-            "100CWT": (10000, 20000),
-            "200CWT": (20000, 30000),
-            "300CWT": (30000, 50000),
-            "500CWT": (50000, 100000),
-            "1000CWT": (100000, None),  # Open-ended
-        }
+            lane = lanes[lane_key] = {
+                "id": uuid.uuid4(),
+                "tariff_id": tariff.id,
+                "dest_city": dest_city if dest_city else None,
+                "dest_province": dest_province,
+            }
+        lane["min_charge"] = min_charge
+        lane_id = lane["id"]
         
-        for break_def in resolved_break_columns:
-            if isinstance(break_def, dict):
-                break_col = break_def.get("column")
-                rate = row.get(break_col)
-                from_weight = break_def.get("from")
-                to_weight = break_def.get("to")
-            else:
-                break_col = break_def
-                rate = row.get(break_col)
-                from_weight = None
-                to_weight = None
-            
-            if pd.isna(rate) or rate is None or rate == "":
+        # A repeated destination row replaces the breaks of the earlier one
+        lane_breaks = breaks_by_lane[lane_id] = []
+        for rates, from_decimal, to_decimal in break_specs:
+            rate = rates[i]
+            if not np.isfinite(rate):
                 continue
-            
-            col_str = str(break_col).upper().strip()
-            
-            # If not explicitly defined, look up standard ranges
-            if from_weight is None or to_weight is None:
-                if col_str in STANDARD_BREAK_RANGES:
-                    std_from, std_to = STANDARD_BREAK_RANGES[col_str]
-                    from_weight = from_weight if from_weight is not None else std_from
-                    to_weight = to_weight if to_weight is not None else std_to
-                else:
-                    # Try to parse numeric column names
-                    if col_str.isdigit():
-                        weight_val = int(col_str)
-                        # Infer range based on common patterns
-                        if weight_val < 500:
-                            from_weight, to_weight = 0, 500
-                        elif weight_val < 1000:
-                            from_weight, to_weight = 500, 1000
-                        elif weight_val < 2000:
-                            from_weight, to_weight = 1000, 2000
-                        elif weight_val < 5000:
-                            from_weight, to_weight = 2000, 5000
-                        elif weight_val < 10000:
-                            from_weight, to_weight = 5000, 10000
-                        else:
-                            from_weight, to_weight = 10000, None
-                    else:
-                        continue  # Can't parse, skip
-            
-            from_decimal = Decimal(str(from_weight)) if from_weight is not None else Decimal("0")
-            to_decimal = Decimal(str(to_weight)) if to_weight is not None else None
-            
-            break_row = TariffBreak(
-                tariff_lane_id=lane.id,
-                break_from_weight=from_decimal,
-                break_to_weight=to_decimal,
-                rate_per_cwt=Decimal(str(rate))
-            )
-            db.add(break_row)
+            lane_breaks.append({
+                "tariff_lane_id": lane_id,
+                "break_from_weight": from_decimal,
+                "break_to_weight": to_decimal,
+                "rate_per_cwt": _cell_decimal(rate, _RATE_QUANTUM),
+            })
     
+    _insert_lanes_and_breaks(db, list(lanes.values()), breaks_by_lane)
     db.commit()
     return tariff
 
@@ -4,12 +4,14 @@ Run this after setting up the database and installing dependencies.
 """
 import sys
 import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from app.db.database import SessionLocal
+from app.db.database import SessionLocal, settings
 from app.services.tariff_ingestion import (
     parse_apps_tariff,
     ingest_rosedale_tariff,
@@ -41,75 +43,76 @@ TARIFF_FILES = {
 }
 
 
-def ingest_all_tariffs():
-    """Ingest all tariff files."""
+# Each carrier's file becomes its own tariff, so files can be ingested concurrently
+TARIFF_INGESTERS = {
+    "APPS": parse_apps_tariff,
+    "Rosedale": ingest_rosedale_tariff,
+    "Maritime Ontario": ingest_maritime_ontario_tariff,
+    "Groupe Guilbault": ingest_guilbault_tariff,
+    "CFF": ingest_cff_tariff,
+}
+INGEST_MAX_WORKERS = 4
+
+
+def _ingest_tariff_file(carrier: str, file_path: str) -> dict:
+    """Ingest one carrier's file in its own session (runs in a worker process)."""
     db = SessionLocal()
-    
     try:
-        results = {}
-        
-        # Ingest APPS
-        if TARIFF_FILES["APPS"].exists():
-            print(f"Ingesting APPS tariff from {TARIFF_FILES['APPS']}...")
-            tariff = parse_apps_tariff(str(TARIFF_FILES["APPS"]), db)
-            results["APPS"] = {"id": str(tariff.id), "lanes": len(tariff.lanes)}
-            print(f"✓ APPS: {len(tariff.lanes)} lanes loaded")
-        else:
-            print(f"✗ APPS file not found: {TARIFF_FILES['APPS']}")
-        
-        # Ingest Rosedale
-        if TARIFF_FILES["Rosedale"].exists():
-            print(f"\nIngesting Rosedale tariff from {TARIFF_FILES['Rosedale']}...")
-            tariff = ingest_rosedale_tariff(str(TARIFF_FILES["Rosedale"]), db)
-            results["Rosedale"] = {"id": str(tariff.id), "lanes": len(tariff.lanes)}
-            print(f"✓ Rosedale: {len(tariff.lanes)} lanes loaded")
-        else:
-            print(f"✗ Rosedale file not found: {TARIFF_FILES['Rosedale']}")
-        
-        # Ingest Maritime Ontario
-        if TARIFF_FILES["Maritime Ontario"].exists():
-            print(f"\nIngesting Maritime Ontario tariff from {TARIFF_FILES['Maritime Ontario']}...")
-            tariff = ingest_maritime_ontario_tariff(str(TARIFF_FILES["Maritime Ontario"]), db)
-            results["Maritime Ontario"] = {"id": str(tariff.id), "lanes": len(tariff.lanes)}
-            print(f"✓ Maritime Ontario: {len(tariff.lanes)} lanes loaded")
-        else:
-            print(f"✗ Maritime Ontario file not found: {TARIFF_FILES['Maritime Ontario']}")
-        
-        # Ingest Groupe Guilbault
-        if TARIFF_FILES["Groupe Guilbault"].exists():
-            print(f"\nIngesting Groupe Guilbault tariff from {TARIFF_FILES['Groupe Guilbault']}...")
-            tariff = ingest_guilbault_tariff(str(TARIFF_FILES["Groupe Guilbault"]), db)
-            results["Groupe Guilbault"] = {"id": str(tariff.id), "lanes": len(tariff.lanes)}
-            print(f"✓ Groupe Guilbault: {len(tariff.lanes)} lanes loaded")
-        else:
-            print(f"✗ Groupe Guilbault file not found: {TARIFF_FILES['Groupe Guilbault']}")
-        
-        # Ingest CFF
-        if TARIFF_FILES["CFF"].exists():
-            print(f"\nIngesting CFF tariff from {TARIFF_FILES['CFF']}...")
-            tariff = ingest_cff_tariff(str(TARIFF_FILES["CFF"]), db)
-            results["CFF"] = {"id": str(tariff.id), "lanes": len(tariff.lanes)}
-            print(f"✓ CFF: {len(tariff.lanes)} lanes loaded")
-        else:
-            print(f"✗ CFF file not found: {TARIFF_FILES['CFF']}")
-        
-        print("\n" + "="*50)
-        print("Ingestion Summary:")
-        print("="*50)
-        for carrier, info in results.items():
-            print(f"{carrier}: {info['lanes']} lanes (ID: {info['id']})")
-        
-        print("\n✓ All tariffs ingested successfully!")
-        
-    except Exception as e:
-        print(f"\n✗ Error ingesting tariffs: {e}")
-        import traceback
-        traceback.print_exc()
+        tariff = TARIFF_INGESTERS[carrier](file_path, db)
+        return {"id": str(tariff.id), "lanes": len(tariff.lanes)}
+    except Exception:
         db.rollback()
+        raise
     finally:
         db.close()
 
 
+def ingest_all_tariffs(tariff_files=TARIFF_FILES):
+    """Ingest all tariff files, one worker process per carrier file."""
+    results = {}
+    failed = []
+
+    pending = {}
+    for carrier, file_path in tariff_files.items():
+        if file_path.exists():
+            print(f"Ingesting {carrier} tariff from {file_path}...")
+            pending[carrier] = str(file_path)
+        else:
+            print(f"✗ {carrier} file not found: {file_path}")
+
+    # SQLite allows a single writer, so only fan out against a real database
+    max_workers = 1 if settings.database_url.startswith("sqlite") else INGEST_MAX_WORKERS
+    max_workers = max(1, min(max_workers, os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_ingest_tariff_file, carrier, file_path): carrier
+            for carrier, file_path in pending.items()
+        }
+        for future in as_completed(futures):
+            carrier = futures[future]
+            try:
+                results[carrier] = future.result()
+            except Exception as e:
+                failed.append(carrier)
+                print(f"\n✗ Error ingesting {carrier} tariff: {e}")
+                traceback.print_exception(type(e), e, e.__traceback__)
+                continue
+            print(f"✓ {carrier}: {results[carrier]['lanes']} lanes loaded")
+
+    print("\n" + "="*50)
+    print("Ingestion Summary:")
+    print("="*50)
+    for carrier in tariff_files:
+        if carrier in results:
+            info = results[carrier]
+            print(f"{carrier}: {info['lanes']} lanes (ID: {info['id']})")
+
+    if failed:
+        print(f"\n✗ Failed to ingest: {', '.join(failed)}")
+    else:
+        print("\n✓ All tariffs ingested successfully!")
+
+
 if __name__ == "__main__":
     ingest_all_tariffs()
 
@@ -0,0 +1,66 @@
+"""
+Shared pytest setup.
+
+Tests run against an in-memory SQLite database; set before any app module
+creates the engine.
+"""
+import json
+import os
+
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import pytest
+from sqlalchemy import ARRAY, create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.database import Base
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(ARRAY, "sqlite")
+def _compile_array_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+# SQLite has no array type: store ARRAY columns as JSON text there.
+_array_bind_processor = ARRAY.bind_processor
+_array_result_processor = ARRAY.result_processor
+
+
+def _sqlite_array_bind_processor(self, dialect):
+    if dialect.name != "sqlite":
+        return _array_bind_processor(self, dialect)
+    return lambda value: None if value is None else json.dumps(value)
+
+
+def _sqlite_array_result_processor(self, dialect, coltype):
+    if dialect.name != "sqlite":
+        return _array_result_processor(self, dialect, coltype)
+    return lambda value: None if value is None else json.loads(value)
+
+
+ARRAY.bind_processor = _sqlite_array_bind_processor
+ARRAY.result_processor = _sqlite_array_result_processor
+
+
+@pytest.fixture
+def db_session():
+    """Session on a fresh in-memory SQLite schema."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
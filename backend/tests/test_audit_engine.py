@@ -0,0 +1,115 @@
+"""
+Tests for audit runs and the report exception cache.
+"""
+import inspect
+from decimal import Decimal
+
+import pytest
+
+from app.models import AuditRun, Customer, Shipment, SourceFile, Tariff, TariffBreak, TariffLane
+from app.models.tariff import TariffType
+from app.services import report_context, tariff_cache
+from app.services.audit_engine import get_exceptions, iter_exceptions, rerate_audit, run_audit
+
+
+@pytest.fixture
+def audit_run(db_session, monkeypatch):
+    run = AuditRun(customer=Customer(name="Acme"), name="Q1")
+    db_session.add(run)
+    db_session.flush()
+    source_file = SourceFile(
+        audit_run_id=run.id, original_filename="jan.csv", storage_path="jan.csv", file_type="csv"
+    )
+    db_session.add(source_file)
+    db_session.flush()
+    for ref, weight, charge in (("A1", "100", "0"), ("A2", "800", "120.50"), ("A3", "50", "40")):
+        db_session.add(
+            Shipment(
+                audit_run_id=run.id,
+                source_file_id=source_file.id,
+                shipment_ref=ref,
+                origin_dc="TOR",
+                dest_province="ON",
+                weight=Decimal(weight),
+                actual_charge=Decimal(charge),
+            )
+        )
+    tariff = Tariff(carrier_name="APPS", origin_dc="TOR", tariff_type=TariffType.CWT)
+    db_session.add(tariff)
+    db_session.flush()
+    lane = TariffLane(tariff_id=tariff.id, dest_province="ON", min_charge=Decimal("50"))
+    db_session.add(lane)
+    db_session.flush()
+    db_session.add(
+        TariffBreak(
+            tariff_lane_id=lane.id, break_from_weight=Decimal("0"), rate_per_cwt=Decimal("10")
+        )
+    )
+    db_session.commit()
+    # Start from an empty tariff snapshot and exception cache
+    monkeypatch.setattr(tariff_cache, "_TARIFF_CACHE", None)
+    monkeypatch.setattr(report_context, "_EXCEPTIONS_CACHE", {})
+    return run
+
+
+def _updated_at(db_session, run):
+    db_session.refresh(run)
+    return run.updated_at
+
+
+def test_every_rerun_bumps_updated_at(db_session, audit_run):
+    stamps = []
+    for rerun in (run_audit, run_audit, rerate_audit, rerate_audit):
+        rerun(db_session, audit_run.id)
+        stamps.append(_updated_at(db_session, audit_run))
+    assert len(set(stamps)) == len(stamps)
+    assert stamps == sorted(stamps)
+
+
+def test_rerate_saves_summary_metrics(db_session, audit_run):
+    run_audit(db_session, audit_run.id)
+    rerate_audit(db_session, audit_run.id)
+    db_session.expire_all()
+    summary = db_session.get(AuditRun, audit_run.id).summary_metrics
+    assert summary["shipment_count"] == 3
+    assert "carrier_best_total" in summary
+    assert "rerate_total" in summary["timings"]
+
+
+def test_exception_counts_are_cached_until_the_audit_reruns(db_session, audit_run, monkeypatch):
+    calls = []
+    real_iter_exceptions = report_context.iter_exceptions
+
+    def counting_iter_exceptions(*args):
+        calls.append(args)
+        return real_iter_exceptions(*args)
+
+    monkeypatch.setattr(report_context, "iter_exceptions", counting_iter_exceptions)
+
+    run_audit(db_session, audit_run.id)
+    db_session.refresh(audit_run)
+    assert report_context._cached_exception_counts(db_session, audit_run) == (3, 1, 0)
+    assert report_context._cached_exception_counts(db_session, audit_run) == (3, 1, 0)
+    assert len(calls) == 1
+
+    rerate_audit(db_session, audit_run.id)
+    db_session.refresh(audit_run)
+    report_context._cached_exception_counts(db_session, audit_run)
+    assert len(calls) == 2
+
+
+def test_exceptions_stream_and_outliers_are_ranked(db_session, audit_run, monkeypatch):
+    run_audit(db_session, audit_run.id)
+
+    stream = iter_exceptions(db_session, audit_run.id, "all")
+    assert inspect.isgenerator(stream)
+    assert sorted(exc["shipment_ref"] for exc in stream) == ["A1", "A2", "A3"]
+
+    def refs(exception_type):
+        exceptions = get_exceptions(db_session, audit_run.id, exception_type)
+        return [exc["shipment_ref"] for exc in exceptions]
+
+    assert refs("Zero-Charge") == ["A1"]
+    assert refs("outliers") == ["A3", "A2"]
+    monkeypatch.setattr("app.services.audit_engine.OUTLIER_LIMIT", 1)
+    assert refs("outliers") == ["A3"]
@@ -0,0 +1,70 @@
+"""
+Tests for deterministic column mapping in file_parser.
+"""
+import codecs
+
+import pytest
+from openpyxl import Workbook
+
+from app.services.file_parser import _infer_deterministic_mappings, _sniff_encoding, read_file
+
+
+def _targets(columns):
+    _, target_owner, _ = _infer_deterministic_mappings(tuple(columns), None, None)
+    return target_owner
+
+
+def test_shared_pattern_maps_each_target_once():
+    # 'ref' is a pattern for both shipment_ref and customer_ref.
+    assert _targets(["Ref", "ref"]) == {"shipment_ref": "Ref", "customer_ref": "ref"}
+
+
+def test_exact_hit_still_competes_for_other_targets():
+    target_owner = _targets(["Shipment", "Ref"])
+    assert target_owner["shipment_ref"] == "Shipment"
+    assert target_owner["customer_ref"] == "Ref"
+
+
+def test_duplicate_headers_do_not_claim_a_target_twice():
+    target_owner = _targets(["Origin City", "Origin City", "Dest City"])
+    assert target_owner["origin_city"] == "Origin City"
+    assert list(target_owner.values()).count("Origin City") == 1
+    assert target_owner["dest_city"] == "Dest City"
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        ("Dest City,Weight\nMontréal,10\n".encode("utf-8"), "utf-8"),
+        (codecs.BOM_UTF8 + b"Dest City,Weight\n", "utf-8-sig"),
+        ("Dest City,Weight\n".encode("utf-16"), "utf-16"),
+        # 0x92 is a right single quote in cp1252 and invalid UTF-8
+        ("Dest City,Note\nMontréal,Driver\u2019s call\n".encode("cp1252"), "cp1252"),
+        # 0x81 is undefined in cp1252, so only latin-1 decodes it
+        (b"Dest City,Note\nMontr\xe9al,\x81\n", "latin-1"),
+    ],
+)
+def test_sniff_encoding(tmp_path, payload, expected):
+    path = tmp_path / "upload.csv"
+    path.write_bytes(payload)
+    assert _sniff_encoding(str(path)) == expected
+
+
+def test_read_file_combines_sheets_and_keeps_blank_rows(tmp_path):
+    workbook = Workbook()
+    first = workbook.active
+    first.title = "Jan"
+    for row in (["Ref", "Weight"], ["A1", 100], [None, None], ["A2", 200]):
+        first.append(row)
+    second = workbook.create_sheet("Feb")
+    for row in (["Ref", "Weight", "Charge"], ["B1", 300, 12.5]):
+        second.append(row)
+    workbook.create_sheet("Empty")
+    path = tmp_path / "shipments.xlsx"
+    workbook.save(path)
+
+    df = read_file(str(path), "xlsx")
+    assert list(df.columns) == ["Ref", "Weight", "__sheet_name", "Charge"]
+    assert df["__sheet_name"].tolist() == ["Jan", "Jan", "Jan", "Feb"]
+    assert df["Weight"].iloc[[0, 2, 3]].tolist() == [100, 200, 300]
+    assert df.iloc[1][["Ref", "Weight"]].isna().all()
@@ -0,0 +1,103 @@
+"""
+Tests for the batch normalize endpoint.
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.api import files
+from app.models import AuditRun, Customer, Shipment, SourceFile
+from app.schemas.source_file import ColumnMapping, FileMappingRequest
+
+CSV_HEADER = "Ref,Dest City,Weight\n"
+MAPPINGS = [
+    ColumnMapping(source_column="Ref", target_field="shipment_ref"),
+    ColumnMapping(source_column="Dest City", target_field="dest_city"),
+    ColumnMapping(source_column="Weight", target_field="weight"),
+]
+
+
+@pytest.fixture
+def audit_run(db_session):
+    customer = Customer(name="Acme")
+    run = AuditRun(customer=customer, name="Q1")
+    db_session.add(run)
+    db_session.commit()
+    return run
+
+
+@pytest.fixture(autouse=True)
+def _stop_pool():
+    yield
+    files.shutdown_normalize_executor()
+
+
+def _add_csv(db_session, audit_run, tmp_path, name, rows):
+    """Store a CSV with the mapped header (no header at all when rows is None)."""
+    path = tmp_path / name
+    path.write_text("" if rows is None else CSV_HEADER + rows)
+    source_file = SourceFile(
+        audit_run_id=audit_run.id,
+        original_filename=name,
+        storage_path=str(path),
+        file_type="csv",
+    )
+    db_session.add(source_file)
+    db_session.commit()
+    return source_file
+
+
+def _requests(*source_files):
+    return [FileMappingRequest(file_id=sf.id, mappings=MAPPINGS) for sf in source_files]
+
+
+def test_single_file_is_normalized_inline(db_session, audit_run, tmp_path, monkeypatch):
+    source_file = _add_csv(
+        db_session, audit_run, tmp_path, "jan.csv", "A1,Toronto,100\nA2,Ottawa,250\n"
+    )
+
+    def _no_pool():
+        raise AssertionError("a single file should not start the worker pool")
+
+    monkeypatch.setattr(files, "_get_normalize_executor", _no_pool)
+    result = files.normalize_files_batch(audit_run.id, _requests(source_file), db_session)
+
+    assert result["shipments_created"] == 2
+    assert [f["file_id"] for f in result["files"]] == [str(source_file.id)]
+    refs = {row.shipment_ref for row in db_session.query(Shipment).all()}
+    assert refs == {"A1", "A2"}
+
+
+def test_batches_share_one_worker_pool(db_session, audit_run, tmp_path):
+    jan = _add_csv(db_session, audit_run, tmp_path, "jan.csv", "A1,Toronto,100\n")
+    feb = _add_csv(db_session, audit_run, tmp_path, "feb.csv", "B1,Calgary,300\n")
+
+    first = files.normalize_files_batch(audit_run.id, _requests(jan, feb), db_session)
+    pool = files._get_normalize_executor()
+    second = files.normalize_files_batch(audit_run.id, _requests(jan, feb), db_session)
+
+    assert first["shipments_created"] == second["shipments_created"] == 2
+    assert files._get_normalize_executor() is pool
+    # Re-normalizing replaces the previous rows instead of duplicating them
+    assert db_session.query(Shipment).count() == 2
+
+
+def test_failed_file_is_named_and_nothing_is_committed(db_session, audit_run, tmp_path):
+    good = _add_csv(db_session, audit_run, tmp_path, "good.csv", "A1,Toronto,100\n")
+    bad = _add_csv(db_session, audit_run, tmp_path, "bad.csv", None)
+
+    with pytest.raises(HTTPException) as excinfo:
+        files.normalize_files_batch(audit_run.id, _requests(good, bad), db_session)
+
+    assert excinfo.value.status_code == 500
+    assert "bad.csv:" in excinfo.value.detail
+    assert "good.csv" not in excinfo.value.detail
+    assert db_session.query(Shipment).count() == 0
+
+
+def test_duplicate_file_ids_are_rejected(db_session, audit_run, tmp_path):
+    source_file = _add_csv(db_session, audit_run, tmp_path, "jan.csv", "A1,Toronto,100\n")
+
+    with pytest.raises(HTTPException) as excinfo:
+        files.normalize_files_batch(audit_run.id, _requests(source_file, source_file), db_session)
+
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,32 @@
+"""
+Tests for origin DC inference in the normalizer.
+"""
+import pandas as pd
+import pytest
+
+from app.services.normalizer import _infer_origin_dc, infer_origin_dc_series
+
+CITIES = [
+    ("Toronto", "TOR"),
+    (" mississauga ", "MISS"),
+    ("Niagara Falls", "NIAGARA"),
+    ("Calgary AB", "CGY"),
+    # Several mapped names: the first in ORIGIN_DC_MAPPINGS order wins, not the leftmost
+    ("Scarborough Toronto", "TOR"),
+    ("Vancouver Richmond", "RICHMOND"),
+    ("Niagara Falls Brampton", "BRAMP"),
+    ("Halifax", "HALIFAX"),
+]
+
+
+@pytest.mark.parametrize("city, expected", CITIES)
+def test_infer_origin_dc(city, expected):
+    assert _infer_origin_dc(city) == expected
+
+
+def test_series_matches_scalar_inference():
+    cities = pd.Series([city for city, _ in CITIES] + [None, "Toronto"], dtype=object)
+    result = infer_origin_dc_series(cities)
+    assert result.tolist()[: len(CITIES)] == [expected for _, expected in CITIES]
+    assert pd.isna(result.iloc[len(CITIES)])
+    assert result.iloc[-1] == "TOR"
@@ -0,0 +1,84 @@
+"""
+Parity tests for the numba CWT kernel against the NumPy fallback.
+"""
+import numpy as np
+import pytest
+
+from app.services import rating_engine
+from app.services.rating_engine import NO_CHARGE_UNITS, cwt_base_units_array, cwt_base_units_lanes
+from app.services.tariff_cache import CwtBreak, TariffLaneCache
+
+requires_numba = pytest.mark.skipif(
+    rating_engine._rate_cwt_jit is None, reason="numba not installed"
+)
+
+
+def _lane(breaks, min_charge_units=0):
+    lane = TariffLaneCache(
+        min_charge_units=min_charge_units,
+        cwt_breaks=[CwtBreak(start, end, units) for start, end, units in breaks],
+    )
+    lane.index_cwt_breaks()
+    return lane
+
+
+# Contiguous standard breaks
+DISJOINT_LANE = _lane(
+    [
+        (0.0, 500.0, 250_000),
+        (500.0, 1000.0, 200_000),
+        (1000.0, 2000.0, 150_000),
+        (2000.0, None, 100_000),
+    ],
+    min_charge_units=400_000,
+)
+# Overlapping breaks, a gap at 300-400 lb and nothing below 100 lb
+OVERLAPPING_LANE = _lane(
+    [
+        (100.0, 300.0, 300_000),
+        (200.0, 1000.0, 220_000),
+        (400.0, 700.0, 180_000),
+        (900.0, None, 90_000),
+    ],
+    min_charge_units=50_000,
+)
+EMPTY_LANE = _lane([])
+
+WEIGHTS = np.array(
+    [np.nan, -5.0, 0.0, 1.0, 50.0, 99.9, 100.0, 250.0, 299.99, 300.0, 350.0, 400.0,
+     499.5, 500.0, 650.0, 700.0, 950.0, 999.99, 1000.0, 1999.0, 2000.0, 12_345.6],
+    dtype=np.float64,
+)
+
+
+def _numpy_path(monkeypatch, func, *args):
+    with monkeypatch.context() as patch:
+        patch.setattr(rating_engine, "_rate_cwt_jit", None)
+        return func(*args)
+
+
+@requires_numba
+@pytest.mark.parametrize("lane", [DISJOINT_LANE, OVERLAPPING_LANE, EMPTY_LANE])
+def test_cwt_base_units_array_matches_numpy(monkeypatch, lane):
+    expected = _numpy_path(monkeypatch, cwt_base_units_array, WEIGHTS, lane)
+    np.testing.assert_array_equal(cwt_base_units_array(WEIGHTS, lane), expected)
+
+
+@requires_numba
+def test_cwt_base_units_lanes_matches_numpy(monkeypatch):
+    rows = np.arange(len(WEIGHTS))
+    lane_rows = [
+        (rows[0::3], DISJOINT_LANE),
+        (rows[1::3], OVERLAPPING_LANE),
+        (rows[5:6], EMPTY_LANE),
+    ]
+    expected = _numpy_path(monkeypatch, cwt_base_units_lanes, WEIGHTS, lane_rows)
+    actual = cwt_base_units_lanes(WEIGHTS, lane_rows)
+    np.testing.assert_array_equal(actual, expected)
+    # Rows 2, 5, 8, ... are in no lane or an empty one
+    assert (actual[rows[2::3]] == NO_CHARGE_UNITS).all()
+
+
+def test_cwt_base_units_array_applies_minimum_and_breaks():
+    units = cwt_base_units_array(np.array([np.nan, 100.0, 601.0, 2500.0]), DISJOINT_LANE)
+    assert units.tolist() == [NO_CHARGE_UNITS, 400_000, 7 * 200_000, 25 * 100_000]
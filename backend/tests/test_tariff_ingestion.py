@@ -0,0 +1,74 @@
+"""
+Tests for tariff workbook reading in tariff_ingestion.
+"""
+import pandas as pd
+from openpyxl import Workbook
+
+from app.services.tariff_ingestion import _read_excel_resilient
+
+EXPECTED_HEADERS = ["DESTINATION", "PROV", "MIN", "500"]
+
+
+def _write_sheet(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_detects_shifted_header_row(tmp_path):
+    path = _write_sheet(
+        tmp_path / "shifted.xlsx",
+        [
+            ["Carrier X tariff"],
+            ["Effective 2024-01-01"],
+            [],
+            ["Destination", "Prov", "Min", "500"],
+            ["TORONTO", "ON", 45.5, 12.25],
+            ["OTTAWA", "ON", 50, 13],
+        ],
+    )
+    df = _read_excel_resilient(path, expected_headers=EXPECTED_HEADERS)
+    assert list(df.columns) == ["Destination", "Prov", "Min", "500"]
+    assert df["Destination"].tolist() == ["TORONTO", "OTTAWA"]
+    assert df["Min"].tolist() == [45.5, 50]
+
+
+def test_blank_and_duplicate_header_labels(tmp_path):
+    path = _write_sheet(
+        tmp_path / "dups.xlsx",
+        [
+            ["Notes"],
+            [" Destination ", "Prov", None, "Min", "Min"],
+            ["TORONTO", "ON", None, 45, 46],
+            [],
+            ["OTTAWA", "ON", "x", 50, 51],
+        ],
+    )
+    df = _read_excel_resilient(path, expected_headers=EXPECTED_HEADERS)
+    assert list(df.columns) == ["Destination", "Prov", "Unnamed: 2", "Min", "Min.1"]
+    # The blank sheet row stays in the frame as an all-NaN row.
+    assert len(df) == 3
+    assert df.iloc[1].isna().all()
+    assert df["Min.1"].tolist()[::2] == [46, 51]
+
+
+def test_weak_header_signal_keeps_first_row(tmp_path):
+    path = _write_sheet(
+        tmp_path / "plain.xlsx",
+        [["City", "Rate"], ["TORONTO", 1.5], ["Prov", "Rate"]],
+    )
+    df = _read_excel_resilient(path, expected_headers=EXPECTED_HEADERS)
+    assert list(df.columns) == ["City", "Rate"]
+    assert len(df) == 2
+
+
+def test_explicit_header_row(tmp_path):
+    path = _write_sheet(
+        tmp_path / "explicit.xlsx",
+        [["Title"], ["Destination", "Min"], ["TORONTO", 45]],
+    )
+    df = _read_excel_resilient(path, header_row=1)
+    pd.testing.assert_frame_equal(df, pd.DataFrame({"Destination": ["TORONTO"], "Min": [45]}))
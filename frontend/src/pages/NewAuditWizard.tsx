@@ -350,14 +350,14 @@ export default function NewAuditWizard() {
     setStep('processing')
 
     try {
-      // Normalize each file
-      for (const file of uploadedFiles) {
-        const fileMappings = (mappings[file.id] || []).filter((mapping) => mapping.target_field)
-        await api.post(`/files/${file.id}/normalize`, {
+      // Normalize all files in one request (parsed in parallel server-side)
+      await api.post(
+        `/files/${auditRunId}/normalize-batch`,
+        uploadedFiles.map((file) => ({
           file_id: file.id,
-          mappings: fileMappings,
-        })
-      }
+          mappings: (mappings[file.id] || []).filter((mapping) => mapping.target_field),
+        }))
+      )
 
       setUploadProgress(70)
 